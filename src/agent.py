@@ -1,13 +1,34 @@
+import asyncio
+import json
 import os
 import re
-from typing import Any, Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from pydantic import BaseModel, Field
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from src import telemetry
+from src.cache import TranslationCache
+from src.models import ENSEMBLE_NAME
 
 load_dotenv()
 
+TRANSLATION_CACHE_PATH = Path(__file__).parent.parent / "data" / "translation_cache.sqlite"
+TRANSLATION_BATCH_SIZE = 20
+# 每条短信预留的翻译输出 token 数；单次请求的输出上限为 DeepSeek 的 8192，超出会直接返回 400
+TRANSLATION_TOKENS_PER_TEXT = 500
+MAX_OUTPUT_TOKENS = 8192
+
+# get_model_comparison 对比的模型
+COMPARISON_MODELS = ["logreg", "lightgbm"]
+
+TRANSLATION_SYSTEM_PROMPT = "你是一个专业的翻译助手。请将中文短信翻译成英文，保持原意不变，不要添加任何额外内容。"
+
 
 class PredictionResult(BaseModel):
     is_spam: bool = Field(description="是否为垃圾短信")
@@ -20,53 +41,287 @@ class AnalysisResult(BaseModel):
     risk_factors: List[str] = Field(description="风险因素列表")
     explanation: str = Field(description="模型预测的解释")
     action_suggestion: str = Field(description="行动建议")
+    source: str = Field(default="llm", description="分析来源：llm 或 local")
+
+
+class AnalysisPolicy(BaseModel):
+    """分级分析策略：概率落在 (ham_below, spam_above) 之间的不确定样本才交给 LLM"""
+    ham_below: float = Field(default=0.1, description="低于该概率视为高置信度正常短信")
+    spam_above: float = Field(default=0.9, description="高于该概率视为高置信度垃圾短信")
+
+    def needs_llm(self, probability: float) -> bool:
+        return self.ham_below < probability < self.spam_above
+
+
+def build_local_analysis(
+    text: str,
+    prediction_result: PredictionResult,
+    contributions: List[Tuple[str, float]],
+    policy: AnalysisPolicy,
+) -> AnalysisResult:
+    """根据模型的 n-gram 贡献（见 SpamClassifier.explain）生成分析结果，不调用 LLM"""
+    summary = text if len(text) <= 50 else text[:50] + "..."
+    probability = prediction_result.probability
+
+    risk_factors = [f"关键词「{term}」提高了垃圾短信概率 (+{weight:.2f})" for term, weight in contributions if weight > 0]
+    if not risk_factors:
+        risk_factors = [f"模型以 {probability:.2%} 的概率判定为垃圾短信"] if prediction_result.is_spam else ["未识别到明显风险因素"]
+
+    if prediction_result.is_spam:
+        explanation = f"{prediction_result.model_used} 模型给出的垃圾短信概率为 {probability:.2%}。"
+        action_suggestion = "建议直接删除并举报该短信，不要点击其中的链接或回复。"
+    else:
+        explanation = f"{prediction_result.model_used} 模型给出的垃圾短信概率仅为 {probability:.2%}。"
+        action_suggestion = "正常短信，可放心阅读。"
+    if contributions:
+        evidence = "、".join(f"「{term}」({weight:+.2f})" for term, weight in contributions)
+        explanation += f"影响最大的词语及其贡献（对数几率）：{evidence}。"
+    if not policy.needs_llm(probability):
+        explanation += "预测置信度高，未调用 LLM 进一步分析。"
+
+    return AnalysisResult(
+        summary=summary,
+        risk_factors=risk_factors,
+        explanation=explanation,
+        action_suggestion=action_suggestion,
+        source="local"
+    )
+
+
+class AnalysisParser:
+    """逐行增量解析 LLM 的分析报告，完整响应和流式响应共用同一套规则"""
+
+    def __init__(self):
+        self.summary = ""
+        self.risk_factors: List[str] = []
+        self.explanation = ""
+        self.action_suggestion = ""
+        self._current_section = None
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> bool:
+        """追加一段文本，返回是否解析出了新的完整行"""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._feed_line(line)
+        return bool(lines)
+
+    def close(self):
+        if self._buffer:
+            self._feed_line(self._buffer)
+            self._buffer = ""
+
+    def _feed_line(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+
+        if "摘要" in line or "summary" in line.lower():
+            self._current_section = "summary"
+            return
+        elif "风险因素" in line or "risk" in line.lower():
+            self._current_section = "risk"
+            return
+        elif "解释" in line or "explain" in line.lower():
+            self._current_section = "explanation"
+            return
+        elif "建议" in line or "action" in line.lower():
+            self._current_section = "action"
+            return
+
+        if self._current_section == "summary":
+            self.summary += line + " "
+        elif self._current_section == "risk":
+            if line.startswith("-") or line.startswith("•"):
+                self.risk_factors.append(line.lstrip("-• ").strip())
+        elif self._current_section == "explanation":
+            self.explanation += line + " "
+        elif self._current_section == "action":
+            self.action_suggestion += line + " "
+
+    def result(self, final: bool = True) -> AnalysisResult:
+        risk_factors = list(self.risk_factors)
+        if final and not risk_factors:
+            risk_factors = ["未识别到明显风险因素"]
+        return AnalysisResult(
+            summary=self.summary.strip(),
+            risk_factors=risk_factors,
+            explanation=self.explanation.strip(),
+            action_suggestion=self.action_suggestion.strip()
+        )
 
 
 class SpamAgent:
-    def __init__(self, ml_model):
-        self.client = OpenAI(
+    def __init__(
+        self,
+        ml_model,
+        client: Optional[OpenAI] = None,
+        translation_cache: Optional[TranslationCache] = None,
+        policy: Optional[AnalysisPolicy] = None,
+    ):
+        self.client = client or OpenAI(
             api_key=os.getenv("DEEPSEEK_API_KEY"),
             base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
         )
         self.ml_model = ml_model
+        self.translation_cache = translation_cache or TranslationCache(path=TRANSLATION_CACHE_PATH)
+        self.policy = policy or AnalysisPolicy()
 
-    def _is_chinese(self, text: str) -> bool:
+    @staticmethod
+    def _is_chinese(text: str) -> bool:
         """检测文本是否包含中文字符"""
-        return bool(re.search(r'[\u4e00-\u9fff]', text))
+        with telemetry.stage_timer("language_detection"):
+            return bool(re.search(r'[\u4e00-\u9fff]', text))
+
+    @staticmethod
+    def _cached_translation(translation_cache: TranslationCache, text: str) -> Optional[str]:
+        """查询翻译缓存并统计命中率；SpamAgent 和 AsyncSpamAgent 共用"""
+        cached = translation_cache.get_translation(text)
+        telemetry.count_cache("translation", cached is not None, cached is None)
+        return cached
+
+    @staticmethod
+    def _cached_english(translation_cache: TranslationCache, text: str) -> Optional[str]:
+        """本地分析不触发翻译：中文短信只使用已缓存的译文，没有时返回 None"""
+        return translation_cache.get_translation(text) if SpamAgent._is_chinese(text) else text
+
+    def _translate_to_english(self, text: str) -> Tuple[str, bool]:
+        """将中文文本翻译成英文，返回 (译文, 是否成功)；失败时返回原文"""
+        cached = self._cached_translation(self.translation_cache, text)
+        if cached is not None:
+            return cached, True
 
-    def _translate_to_english(self, text: str) -> str:
-        """将中文文本翻译成英文"""
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的翻译助手。请将中文短信翻译成英文，保持原意不变，不要添加任何额外内容。"},
-                    {"role": "user", "content": f"请将以下中文短信翻译成英文：\n\n{text}"}
-                ],
-                temperature=0.1,
-                max_tokens=500
-            )
+            with telemetry.stage_timer("translation"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=self._translation_messages(text),
+                    temperature=0.1,
+                    max_tokens=TRANSLATION_TOKENS_PER_TEXT
+                )
+            telemetry.record_llm_call("translation", response)
             translated_text = response.choices[0].message.content.strip()
-            return translated_text
+            self.translation_cache.set_translation(text, translated_text)
+            return translated_text, True
         except Exception as e:
+            telemetry.count_error("translation")
             print(f"翻译失败: {e}")
-            return text
+            return text, False
 
-    def predict_spam(self, text: str, model_name: str = "lightgbm") -> PredictionResult:
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """批量翻译：未命中缓存的中文短信每 TRANSLATION_BATCH_SIZE 条合并为一次 LLM 请求"""
+        translations = {}
+        pending = []
+        n_hits = 0
+        for text in dict.fromkeys(texts):
+            if not self._is_chinese(text):
+                translations[text] = text
+            elif (cached := self.translation_cache.get_translation(text)) is not None:
+                translations[text] = cached
+                n_hits += 1
+            else:
+                pending.append(text)
+        telemetry.count_cache("translation", n_hits, len(pending))
+
+        for i in range(0, len(pending), TRANSLATION_BATCH_SIZE):
+            chunk = pending[i:i + TRANSLATION_BATCH_SIZE]
+            translated_chunk = self._translate_chunk(chunk)
+            if translated_chunk is None:
+                # 批量结果无法解析时逐条翻译
+                translated_chunk = [self._translate_to_english(text)[0] for text in chunk]
+            else:
+                for text, translated_text in zip(chunk, translated_chunk):
+                    self.translation_cache.set_translation(text, translated_text)
+            translations.update(zip(chunk, translated_chunk))
+
+        return [translations[text] for text in texts]
+
+    @staticmethod
+    def _translation_messages(text: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": TRANSLATION_SYSTEM_PROMPT},
+            {"role": "user", "content": f"请将以下中文短信翻译成英文：\n\n{text}"}
+        ]
+
+    @staticmethod
+    def _batch_translation_messages(texts: List[str]) -> List[Dict[str, str]]:
+        numbered = json.dumps(texts, ensure_ascii=False)
+        return [
+            {"role": "system", "content": TRANSLATION_SYSTEM_PROMPT},
+            {"role": "user", "content": (
+                f"下面是一个包含 {len(texts)} 条中文短信的 JSON 数组，请逐条翻译成英文，"
+                f"只返回同样长度、同样顺序的 JSON 字符串数组：\n\n{numbered}"
+            )}
+        ]
+
+    @staticmethod
+    def _parse_batch_translation(content: str, expected: int) -> Optional[List[str]]:
+        content = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip())
+        try:
+            translated = json.loads(content)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(translated, list) or len(translated) != expected:
+            return None
+        return [str(item).strip() for item in translated]
+
+    def _translate_chunk(self, texts: List[str]) -> Optional[List[str]]:
+        try:
+            with telemetry.stage_timer("translation"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=self._batch_translation_messages(texts),
+                    temperature=0.1,
+                    max_tokens=min(MAX_OUTPUT_TOKENS, TRANSLATION_TOKENS_PER_TEXT * len(texts))
+                )
+        except Exception as e:
+            telemetry.count_error("translation")
+            print(f"批量翻译失败: {e}")
+            return None
+        telemetry.record_llm_call("translation", response)
+        return self._parse_batch_translation(response.choices[0].message.content, len(texts))
+
+    def _to_english(self, text: str) -> Tuple[str, bool]:
         # 如果是中文，先翻译成英文
         if self._is_chinese(text):
             print("检测到中文文本，正在翻译成英文...")
-            text = self._translate_to_english(text)
+            text, translated = self._translate_to_english(text)
             print(f"翻译结果: {text}")
-        
-        prediction, probability = self.ml_model.predict(model_name, text)
-        return PredictionResult(
-            is_spam=bool(prediction),
-            probability=float(probability),
-            model_used=model_name
-        )
+            return text, translated
+        return text, True
 
-    def analyze_with_llm(self, text: str, prediction_result: PredictionResult) -> AnalysisResult:
+    def _predict_models(self, text: str, model_names: List[str]) -> Dict[str, PredictionResult]:
+        """对同一条短信运行多个模型，翻译最多只做一次；预测缓存由分类器按译文查询和写入"""
+        english_text, translated = self._to_english(text)
+        # 翻译失败时按原文打分，但不写入预测缓存，避免 TTL 内一直返回未翻译文本的分数
+        probabilities = self.ml_model.predict_models(model_names, english_text, use_cache=translated)
+        return self._prediction_results(self.ml_model, probabilities)
+
+    @staticmethod
+    def _prediction_results(ml_model, probabilities: Dict[str, float]) -> Dict[str, PredictionResult]:
+        return {
+            model_name: PredictionResult(
+                is_spam=ml_model.is_spam(model_name, probability),
+                probability=probability,
+                model_used=model_name
+            )
+            for model_name, probability in probabilities.items()
+        }
+
+    def predict_spam(self, text: str, model_name: str = "lightgbm") -> PredictionResult:
+        return self._predict_models(text, [model_name])[model_name]
+
+    def predict_spam_batch(self, texts: List[str], model_name: str = "lightgbm") -> List[PredictionResult]:
+        english_texts = self.translate_batch(texts)
+        labels, probabilities = self.ml_model.predict_batch(model_name, english_texts)
+        return [
+            PredictionResult(is_spam=bool(label), probability=float(probability), model_used=model_name)
+            for label, probability in zip(labels, probabilities)
+        ]
+
+    @staticmethod
+    def _analysis_messages(text: str, prediction_result: PredictionResult) -> List[Dict[str, str]]:
         prompt = f"""你是一个专业的垃圾短信分析专家。请分析以下短信内容，并提供详细的分析报告。
 
 短信内容: {text}
@@ -83,69 +338,96 @@ class SpamAgent:
 4. 根据预测结果，给出具体的行动建议（如：删除、举报、忽略等）
 
 请用中文回答，保持专业和客观。"""
+        return [
+            {"role": "system", "content": "你是一个专业的垃圾短信分析专家，擅长识别和分析垃圾短信的特征。"},
+            {"role": "user", "content": prompt}
+        ]
 
-        response = self.client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一个专业的垃圾短信分析专家，擅长识别和分析垃圾短信的特征。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1000
-        )
+    def analyze_with_llm(self, text: str, prediction_result: PredictionResult) -> AnalysisResult:
+        try:
+            with telemetry.stage_timer("llm_analysis"):
+                response = self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=self._analysis_messages(text, prediction_result),
+                    temperature=0.3,
+                    max_tokens=1000
+                )
+        except Exception:
+            telemetry.count_error("llm_analysis")
+            raise
+        telemetry.record_llm_call("analysis", response)
 
         content = response.choices[0].message.content
 
         analysis = self._parse_llm_response(content)
         return analysis
 
-    def _parse_llm_response(self, content: str) -> AnalysisResult:
-        summary = ""
-        risk_factors = []
-        explanation = ""
-        action_suggestion = ""
+    @staticmethod
+    def _parse_llm_response(content: str) -> AnalysisResult:
+        parser = AnalysisParser()
+        parser.feed(content)
+        parser.close()
+        return parser.result()
 
-        lines = content.split("\n")
-        current_section = None
+    def analyze_with_llm_stream(self, text: str, prediction_result: PredictionResult) -> Iterator[AnalysisResult]:
+        """流式调用 LLM，每解析出一行新内容就产出一个部分 AnalysisResult，最后产出完整结果"""
+        parser = AnalysisParser()
+        # 只统计等待 LLM 的时间，调用方处理部分结果的时间不计入；usage 在最后一个 chunk 中返回
+        llm_seconds, usage_chunk = 0.0, None
+        resumed = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(
+                model="deepseek-chat",
+                messages=self._analysis_messages(text, prediction_result),
+                temperature=0.3,
+                max_tokens=1000,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                if chunk.choices and parser.feed(chunk.choices[0].delta.content or ""):
+                    llm_seconds += time.perf_counter() - resumed
+                    yield parser.result(final=False)
+                    resumed = time.perf_counter()
+            llm_seconds += time.perf_counter() - resumed
+        except Exception:
+            telemetry.count_error("llm_analysis")
+            raise
+        finally:
+            telemetry.record_llm_call("analysis", usage_chunk)
+            telemetry.observe_stage("llm_analysis", llm_seconds)
+        parser.close()
+        yield parser.result()
 
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            if "摘要" in line or "summary" in line.lower():
-                current_section = "summary"
-                continue
-            elif "风险因素" in line or "risk" in line.lower():
-                current_section = "risk"
-                continue
-            elif "解释" in line or "explain" in line.lower():
-                current_section = "explanation"
-                continue
-            elif "建议" in line or "action" in line.lower():
-                current_section = "action"
-                continue
-            
-            if current_section == "summary":
-                summary += line + " "
-            elif current_section == "risk":
-                if line.startswith("-") or line.startswith("•"):
-                    risk_factors.append(line.lstrip("-• ").strip())
-            elif current_section == "explanation":
-                explanation += line + " "
-            elif current_section == "action":
-                action_suggestion += line + " "
+    def local_analysis(self, text: str, prediction_result: PredictionResult) -> AnalysisResult:
+        """高置信度样本的本地分析，不调用 LLM；中文短信只在已有翻译缓存时才做 n-gram 归因"""
+        english_text = self._cached_english(self.translation_cache, text)
+        contributions = []
+        if english_text is not None and hasattr(self.ml_model, "explain"):
+            with telemetry.stage_timer("local_analysis"):
+                contributions = self.ml_model.explain(prediction_result.model_used, english_text)
+        return build_local_analysis(text, prediction_result, contributions, self.policy)
 
-        return AnalysisResult(
-            summary=summary.strip(),
-            risk_factors=risk_factors if risk_factors else ["未识别到明显风险因素"],
-            explanation=explanation.strip(),
-            action_suggestion=action_suggestion.strip()
-        )
+    def analyze(self, text: str, prediction_result: PredictionResult, force_llm: bool = False) -> AnalysisResult:
+        """按分级策略分析：只有不确定区间内的样本或 force_llm=True 时才调用 LLM"""
+        if force_llm or self.policy.needs_llm(prediction_result.probability):
+            return self.analyze_with_llm(text, prediction_result)
+        return self.local_analysis(text, prediction_result)
+
+    def analyze_stream(
+        self, text: str, prediction_result: PredictionResult, force_llm: bool = False
+    ) -> Iterator[AnalysisResult]:
+        """analyze 的流式版本：需要 LLM 时逐步产出部分结果，否则直接产出本地分析结果"""
+        if force_llm or self.policy.needs_llm(prediction_result.probability):
+            yield from self.analyze_with_llm_stream(text, prediction_result)
+        else:
+            yield self.local_analysis(text, prediction_result)
 
-    def full_analysis(self, text: str, model_name: str = "lightgbm") -> Dict[str, Any]:
+    def full_analysis(self, text: str, model_name: str = "lightgbm", force_llm: bool = False) -> Dict[str, Any]:
         prediction_result = self.predict_spam(text, model_name)
-        analysis_result = self.analyze_with_llm(text, prediction_result)
+        analysis_result = self.analyze(text, prediction_result, force_llm)
         
         return {
             "prediction": prediction_result.model_dump(),
@@ -153,11 +435,198 @@ class SpamAgent:
         }
 
     def get_model_comparison(self, text: str) -> Dict[str, Any]:
-        logreg_pred = self.predict_spam(text, "logreg")
-        lgb_pred = self.predict_spam(text, "lightgbm")
-        
+        return self._model_comparison(self.ml_model, self._predict_models(text, COMPARISON_MODELS))
+
+    @staticmethod
+    def _model_comparison(ml_model, predictions: Dict[str, PredictionResult]) -> Dict[str, Any]:
+        logreg_pred, lgb_pred = predictions["logreg"], predictions["lightgbm"]
         return {
             "logistic_regression": logreg_pred.model_dump(),
             "lightgbm": lgb_pred.model_dump(),
+            "ensemble": SpamAgent._ensemble_prediction(ml_model, predictions).model_dump(),
             "agreement": logreg_pred.is_spam == lgb_pred.is_spam
         }
+
+    @staticmethod
+    def _ensemble_prediction(ml_model, predictions: Dict[str, PredictionResult]) -> PredictionResult:
+        """由各模型概率计算集成分数，不再重复打分"""
+        ensemble = ml_model.ensemble(list(predictions))
+        probability = float(ensemble.combine({name: [pred.probability] for name, pred in predictions.items()})[0])
+        return PredictionResult(
+            is_spam=ml_model.is_spam(ENSEMBLE_NAME, probability),
+            probability=probability,
+            model_used=ENSEMBLE_NAME
+        )
+
+
+class AsyncSpamAgent:
+    """SpamAgent 的异步版本：共享 HTTP 连接池、限制并发 LLM 请求数，分类器在线程池中运行
+
+    提示词、解析逻辑和缓存与 SpamAgent 完全一致，适合单进程内同时处理大量分析请求。
+    """
+
+    def __init__(
+        self,
+        ml_model,
+        client: Optional[AsyncOpenAI] = None,
+        translation_cache: Optional[TranslationCache] = None,
+        max_concurrency: int = 32,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        executor: Optional[ThreadPoolExecutor] = None,
+        policy: Optional[AnalysisPolicy] = None,
+    ):
+        self.client = client or AsyncOpenAI(
+            api_key=os.getenv("DEEPSEEK_API_KEY"),
+            base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1"),
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                timeout=timeout,
+            ),
+        )
+        self.ml_model = ml_model
+        self.translation_cache = translation_cache or TranslationCache(path=TRANSLATION_CACHE_PATH)
+        self.policy = policy or AnalysisPolicy()
+        # 客户端内部已按 max_retries 重试，这里再加一个整体超时兜底
+        self.request_timeout = timeout * (max_retries + 1)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = executor or ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4))
+
+    async def _chat(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int, purpose: str) -> str:
+        stage = "translation" if purpose == "translation" else "llm_analysis"
+        async with self._semaphore:
+            try:
+                with telemetry.stage_timer(stage):
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model="deepseek-chat",
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens
+                        ),
+                        self.request_timeout,
+                    )
+            except Exception:
+                telemetry.count_error(stage)
+                raise
+        telemetry.record_llm_call(purpose, response)
+        return response.choices[0].message.content
+
+    async def _run_classifier(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def translate_to_english(self, text: str) -> str:
+        return (await self._translate_to_english(text))[0]
+
+    async def _translate_to_english(self, text: str) -> Tuple[str, bool]:
+        """返回 (译文, 是否成功)；非中文文本原样返回，翻译失败时返回原文"""
+        if not SpamAgent._is_chinese(text):
+            return text, True
+
+        cached = SpamAgent._cached_translation(self.translation_cache, text)
+        if cached is not None:
+            return cached, True
+
+        try:
+            content = await self._chat(
+                SpamAgent._translation_messages(text), temperature=0.1, max_tokens=TRANSLATION_TOKENS_PER_TEXT,
+                purpose="translation"
+            )
+        except Exception as e:
+            print(f"翻译失败: {e}")
+            return text, False
+        translated_text = content.strip()
+        self.translation_cache.set_translation(text, translated_text)
+        return translated_text, True
+
+    async def _predict_models(self, text: str, model_names: List[str]) -> Dict[str, PredictionResult]:
+        english_text, translated = await self._translate_to_english(text)
+        probabilities = await self._run_classifier(self.ml_model.predict_models, model_names, english_text, translated)
+        return SpamAgent._prediction_results(self.ml_model, probabilities)
+
+    async def predict_spam(self, text: str, model_name: str = "lightgbm") -> PredictionResult:
+        return (await self._predict_models(text, [model_name]))[model_name]
+
+    async def analyze_with_llm(self, text: str, prediction_result: PredictionResult) -> AnalysisResult:
+        content = await self._chat(
+            SpamAgent._analysis_messages(text, prediction_result), temperature=0.3, max_tokens=1000, purpose="analysis"
+        )
+        return SpamAgent._parse_llm_response(content)
+
+    async def analyze_with_llm_stream(
+        self, text: str, prediction_result: PredictionResult
+    ) -> AsyncIterator[AnalysisResult]:
+        parser = AnalysisParser()
+        async with self._semaphore:
+            llm_seconds, usage_chunk = 0.0, None
+            resumed = time.perf_counter()
+            try:
+                stream = await self.client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=SpamAgent._analysis_messages(text, prediction_result),
+                    temperature=0.3,
+                    max_tokens=1000,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage_chunk = chunk
+                    if chunk.choices and parser.feed(chunk.choices[0].delta.content or ""):
+                        llm_seconds += time.perf_counter() - resumed
+                        yield parser.result(final=False)
+                        resumed = time.perf_counter()
+                llm_seconds += time.perf_counter() - resumed
+            except Exception:
+                telemetry.count_error("llm_analysis")
+                raise
+            finally:
+                telemetry.record_llm_call("analysis", usage_chunk)
+                telemetry.observe_stage("llm_analysis", llm_seconds)
+        parser.close()
+        yield parser.result()
+
+    async def analyze(self, text: str, prediction_result: PredictionResult, force_llm: bool = False) -> AnalysisResult:
+        if force_llm or self.policy.needs_llm(prediction_result.probability):
+            return await self.analyze_with_llm(text, prediction_result)
+
+        english_text = SpamAgent._cached_english(self.translation_cache, text)
+        contributions = []
+        if english_text is not None and hasattr(self.ml_model, "explain"):
+            with telemetry.stage_timer("local_analysis"):
+                contributions = await self._run_classifier(self.ml_model.explain, prediction_result.model_used, english_text)
+        return build_local_analysis(text, prediction_result, contributions, self.policy)
+
+    async def full_analysis(self, text: str, model_name: str = "lightgbm", force_llm: bool = False) -> Dict[str, Any]:
+        prediction_result = await self.predict_spam(text, model_name)
+        analysis_result = await self.analyze(text, prediction_result, force_llm)
+
+        return {
+            "prediction": prediction_result.model_dump(),
+            "analysis": analysis_result.model_dump()
+        }
+
+    async def analyze_many(self, texts: List[str], model_name: str = "lightgbm", force_llm: bool = False) -> List[Dict[str, Any]]:
+        """并发分析多条短信；单条失败时返回包含 error 字段的结果，不影响其他短信"""
+        results = await asyncio.gather(
+            *(self.full_analysis(text, model_name, force_llm) for text in texts), return_exceptions=True
+        )
+        return [
+            {"error": f"{type(result).__name__}: {result}"} if isinstance(result, BaseException) else result
+            for result in results
+        ]
+
+    async def get_model_comparison(self, text: str) -> Dict[str, Any]:
+        return SpamAgent._model_comparison(self.ml_model, await self._predict_models(text, COMPARISON_MODELS))
+
+    async def aclose(self):
+        await self.client.close()
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncSpamAgent":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
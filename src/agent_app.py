@@ -1,5 +1,7 @@
 import argparse
-from src.models import SpamClassifier
+import sys
+from src.cache import PredictionCache
+from src.registry import load_current
 from src.agent import SpamAgent
 
 
@@ -9,26 +11,27 @@ def main():
     parser.add_argument("--model", type=str, default="lightgbm", choices=["logreg", "lightgbm"], help="使用的模型")
     parser.add_argument("--compare", action="store_true", help="对比两个模型的结果")
     parser.add_argument("--interactive", action="store_true", help="交互式模式")
+    parser.add_argument("--force-llm", action="store_true", help="总是调用 LLM 分析（默认只分析不确定的预测）")
+    parser.add_argument("--stream", action="store_true", help="流式输出 LLM 分析报告")
     
     args = parser.parse_args()
 
     print("正在加载模型...")
-    classifier = SpamClassifier()
-    classifier.load_models()
+    classifier = load_current(cache=PredictionCache())
     agent = SpamAgent(classifier)
     print("✅ 模型加载成功\n")
 
     if args.interactive:
-        interactive_mode(agent)
+        interactive_mode(agent, args.force_llm, args.stream)
     elif args.text:
-        analyze_text(agent, args.text, args.model, args.compare)
+        analyze_text(agent, args.text, args.model, args.compare, args.force_llm, args.stream)
     else:
         print("请提供 --text 参数或使用 --interactive 进入交互模式")
         print("示例: uv run python src/agent_app.py --text '中奖通知'")
         print("示例: uv run python src/agent_app.py --interactive")
 
 
-def analyze_text(agent, text, model, compare):
+def analyze_text(agent, text, model, compare, force_llm=False, stream=False):
     print("=" * 60)
     print("短信内容")
     print("=" * 60)
@@ -51,6 +54,11 @@ def analyze_text(agent, text, model, compare):
         print(f"\nLightGBM:")
         print(f"  预测: {'垃圾短信' if lgb['is_spam'] else '正常短信'}")
         print(f"  概率: {lgb['probability']:.2%}")
+
+        ensemble = comparison["ensemble"]
+        print("\n集成模型:")
+        print(f"  预测: {'垃圾短信' if ensemble['is_spam'] else '正常短信'}")
+        print(f"  概率: {ensemble['probability']:.2%}")
         
         print(f"\n一致性: {'✅ 一致' if comparison['agreement'] else '⚠️ 不一致'}")
         print()
@@ -67,10 +75,16 @@ def analyze_text(agent, text, model, compare):
     print(f"使用模型: {prediction.model_used}")
     print()
 
+    use_llm = force_llm or agent.policy.needs_llm(prediction.probability)
     print("=" * 60)
-    print("LLM 分析报告")
+    print("LLM 分析报告" if use_llm else "本地分析报告（高置信度预测，未调用 LLM）")
     print("=" * 60)
-    analysis = agent.analyze_with_llm(text, prediction)
+
+    if use_llm and stream:
+        print_analysis_stream(agent.analyze_with_llm_stream(text, prediction))
+        return
+
+    analysis = agent.analyze(text, prediction, force_llm=force_llm)
     
     print(f"\n📋 摘要:")
     print(f"  {analysis.summary}")
@@ -87,7 +101,38 @@ def analyze_text(agent, text, model, compare):
     print()
 
 
-def interactive_mode(agent):
+STREAM_SECTIONS = [
+    ("summary", "📋 摘要:"),
+    ("risk_factors", "⚠️ 风险因素:"),
+    ("explanation", "💡 解释:"),
+    ("action_suggestion", "🎯 行动建议:"),
+]
+
+
+def print_analysis_stream(updates):
+    """边接收边打印：每次只输出各部分相对上一次新增的内容"""
+    shown = {}
+    for analysis in updates:
+        for field, header in STREAM_SECTIONS:
+            value = getattr(analysis, field)
+            if not value:
+                continue
+            if field not in shown:
+                print(f"\n\n{header}", end="")
+                shown[field] = [] if field == "risk_factors" else ""
+
+            if field == "risk_factors":
+                for factor in value[len(shown[field]):]:
+                    print(f"\n  - {factor}", end="")
+            else:
+                new_text = value[len(shown[field]):]
+                print(f"\n  {new_text}" if not shown[field] else new_text, end="")
+            shown[field] = value
+        sys.stdout.flush()
+    print("\n")
+
+
+def interactive_mode(agent, force_llm=False, stream=False):
     print("=" * 60)
     print("交互式模式")
     print("=" * 60)
@@ -111,7 +156,7 @@ def interactive_mode(agent):
             compare = input("是否对比模型? (y/n) [默认: n]: ").strip().lower() == 'y'
             
             print()
-            analyze_text(agent, text, model, compare)
+            analyze_text(agent, text, model, compare, force_llm, stream)
             
         except KeyboardInterrupt:
             print("\n\n再见！")
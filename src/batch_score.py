@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+from tqdm import tqdm
+
+from src.data_processing import iter_csv_batches
+from src.models import SpamClassifier
+from src.registry import load_current
+
+# 每个工作进程各自持有一个分类器实例，由 _init_worker 初始化
+_worker_classifier: Optional[SpamClassifier] = None
+
+
+def _init_worker():
+    global _worker_classifier
+    _worker_classifier = load_current()
+
+
+def _score_texts(model_name: str, texts: List[str], explain: bool) -> Tuple[np.ndarray, np.ndarray, Optional[List[str]]]:
+    labels, probabilities = _worker_classifier.predict_batch(model_name, texts)
+    explanations = None
+    if explain:
+        explanations = [
+            "; ".join(f"{term}({weight:+.2f})" for term, weight in contributions)
+            for contributions in _worker_classifier.explain_batch(model_name, texts)
+        ]
+    return labels, probabilities, explanations
+
+
+def iter_input_batches(path: Path, batch_size: int) -> Iterator[pl.DataFrame]:
+    """按块读取 CSV / Parquet / JSONL，任何时刻只在内存中保留一个块"""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        yield from iter_csv_batches(path, batch_size)
+    elif suffix == ".parquet":
+        total = pl.scan_parquet(path).select(pl.len()).collect().item()
+        for offset in range(0, total, batch_size):
+            yield pl.scan_parquet(path).slice(offset, batch_size).collect()
+    elif suffix in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            lines = (line for line in f if line.strip())
+            while chunk := list(itertools.islice(lines, batch_size)):
+                yield pl.DataFrame([json.loads(line) for line in chunk])
+    else:
+        raise ValueError(f"不支持的输入格式: {path.suffix}（支持 .csv / .parquet / .jsonl）")
+
+
+class ResultWriter:
+    """逐块追加写出结果；Parquet 输出为目录下的多个分片文件"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.suffix = path.suffix.lower()
+        self.n_parts = 0
+        self._file = None
+        if self.suffix == ".parquet":
+            self.path.mkdir(parents=True, exist_ok=True)
+        elif self.suffix in (".csv", ".jsonl", ".ndjson"):
+            self._file = open(self.path, "wb")
+        else:
+            raise ValueError(f"不支持的输出格式: {path.suffix}（支持 .csv / .parquet / .jsonl）")
+
+    def write(self, df: pl.DataFrame):
+        if self.suffix == ".parquet":
+            df.write_parquet(self.path / f"part-{self.n_parts:05d}.parquet")
+        elif self.suffix == ".csv":
+            df.write_csv(self._file, include_header=self.n_parts == 0)
+        else:
+            df.write_ndjson(self._file)
+        self.n_parts += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _llm_columns(
+    agent, model_name: str, texts: List[str], labels: np.ndarray, probabilities: np.ndarray, loop
+) -> pl.DataFrame:
+    """只把不确定区间内的短信交给 LLM，其余行留空"""
+    from src.agent import PredictionResult
+
+    summaries, actions = [None] * len(texts), [None] * len(texts)
+    uncertain = [i for i, p in enumerate(probabilities) if agent.policy.needs_llm(float(p))]
+
+    async def analyze_uncertain():
+        return await asyncio.gather(*(
+            agent.analyze_with_llm(
+                texts[i],
+                PredictionResult(is_spam=bool(labels[i]), probability=float(probabilities[i]),
+                                 model_used=model_name)
+            )
+            for i in uncertain
+        ), return_exceptions=True)
+
+    for i, analysis in zip(uncertain, loop.run_until_complete(analyze_uncertain())):
+        if not isinstance(analysis, BaseException):
+            summaries[i], actions[i] = analysis.summary, analysis.action_suggestion
+    return pl.DataFrame({"llm_summary": summaries, "llm_action": actions}, schema={"llm_summary": pl.Utf8, "llm_action": pl.Utf8})
+
+
+def score_file(
+    input_path: Path,
+    output_path: Path,
+    text_column: str = "text",
+    model_name: str = "lightgbm",
+    batch_size: int = 50_000,
+    n_workers: int = 1,
+    explain: bool = False,
+    use_llm: bool = False,
+) -> int:
+    writer = ResultWriter(output_path)
+    agent, loop = None, None
+    if use_llm:
+        from src.agent import AsyncSpamAgent
+
+        agent, loop = AsyncSpamAgent(ml_model=None), asyncio.new_event_loop()
+
+    # 最多同时有 2 * n_workers 个块在处理中，保证内存占用有界且结果按输入顺序写出
+    pending = deque()
+    n_rows = 0
+    progress = tqdm(desc="   打分进度", unit=" 条")
+
+    def flush_one():
+        nonlocal n_rows
+        df, future = pending.popleft()
+        labels, probabilities, explanations = future.result()
+        result = df.with_columns(
+            pl.Series("is_spam", labels.astype(bool)),
+            pl.Series("spam_probability", probabilities),
+        )
+        if explanations is not None:
+            result = result.with_columns(pl.Series("top_features", explanations))
+        if agent is not None:
+            result = pl.concat([result, _llm_columns(agent, model_name, df[text_column].to_list(), labels, probabilities, loop)], how="horizontal")
+        writer.write(result)
+        n_rows += len(df)
+        progress.update(len(df))
+
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker) as pool:
+            for df in iter_input_batches(input_path, batch_size):
+                if text_column not in df.columns:
+                    raise ValueError(f"输入文件中没有文本列: {text_column}")
+                texts = df[text_column].cast(pl.Utf8).fill_null("").to_list()
+                pending.append((df, pool.submit(_score_texts, model_name, texts, explain)))
+                if len(pending) >= 2 * n_workers:
+                    flush_one()
+            while pending:
+                flush_one()
+    finally:
+        progress.close()
+        writer.close()
+        if agent is not None:
+            loop.run_until_complete(agent.aclose())
+            loop.close()
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量垃圾短信打分")
+    parser.add_argument("input", type=Path, help="输入文件（.csv / .parquet / .jsonl）")
+    parser.add_argument("output", type=Path, help="输出文件（.csv / .jsonl），或 .parquet 分片目录")
+    parser.add_argument("--text-column", type=str, default="text", help="短信文本所在列")
+    parser.add_argument("--model", type=str, default="lightgbm", help="使用的模型")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="每个块的行数")
+    parser.add_argument("--workers", type=int, default=1, help="并行打分的进程数")
+    parser.add_argument("--explain", action="store_true", help="附加本地模型解释（影响最大的 n-gram）")
+    parser.add_argument("--llm", action="store_true", help="对不确定区间内的短信调用 LLM 分析（默认完全不调用 LLM）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_rows = score_file(
+        args.input, args.output, args.text_column, args.model, args.batch_size, args.workers, args.explain, args.llm
+    )
+    elapsed = time.perf_counter() - start
+    print(f"   完成: {n_rows} 条，用时 {elapsed:.1f} 秒（{n_rows / max(elapsed, 1e-9):.0f} 条/秒）")
+    print(f"   结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
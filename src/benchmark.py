@@ -0,0 +1,314 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# 各阶段在独立的 spawn 子进程中运行，导入开销和峰值内存互不干扰；
+# 因此本模块顶层只导入标准库和 numpy，被测模块在阶段函数内部导入
+BENCHMARK_DIR = Path(__file__).parent.parent / "data" / "benchmarks"
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_MODELS = ("logreg", "lightgbm")
+STAGES = (
+    "clean_text", "preprocess_polars", "preprocess_python", "preprocess_data_polars", "preprocess_data_python",
+    "vectorizer_transform",
+    "predict", "predict_batch", "load_models",
+)
+
+
+def build_corpus(scale: int, seed: int = 42):
+    """由 archive/spam.csv 生成 scale 倍大小的合成语料：第 k 份副本打乱每条短信的词序，保证清洗后的文本互不相同"""
+    import polars as pl
+    from src.data_processing import load_data
+
+    df = load_data().select("label", "text")
+    labels, texts = df["label"].to_list(), df["text"].to_list()
+    out_labels, out_texts = list(labels), list(texts)
+    for copy in range(1, scale):
+        rng = random.Random(seed + copy)
+        for label, text in zip(labels, texts):
+            words = text.split()
+            rng.shuffle(words)
+            out_labels.append(label)
+            out_texts.append(" ".join(words))
+    return pl.DataFrame({"label": out_labels, "text": out_texts})
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _summarize(latencies: List[float], n_items: int, elapsed: float) -> Dict[str, Any]:
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "n_items": n_items,
+        "n_calls": len(latencies),
+        "elapsed_s": elapsed,
+        "throughput_per_s": n_items / elapsed if elapsed > 0 else None,
+        "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "mean": float(latencies_ms.mean())},
+    }
+
+
+def _timed_calls(func: Callable, calls: List[Any], n_items: int) -> Dict[str, Any]:
+    latencies = []
+    start = time.perf_counter()
+    for arg in calls:
+        t0 = time.perf_counter()
+        func(arg)
+        latencies.append(time.perf_counter() - t0)
+    return _summarize(latencies, n_items, time.perf_counter() - start)
+
+
+def _batches(items: List[Any], batch_size: int) -> List[List[Any]]:
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def _load_classifier():
+    from src.registry import load_current
+
+    return load_current()
+
+
+def _bench_clean_text(df, options) -> Dict[str, Any]:
+    from src.text_cleaning import clean_text
+
+    texts = df["text"].to_list()[:options["samples"]]
+    return _timed_calls(clean_text, texts, len(texts))
+
+
+def _bench_preprocess(df, options, engine: str) -> Dict[str, Any]:
+    """只计时两种引擎的清洗本身，用于比较引擎；完整的 preprocess_data 流程见 _bench_preprocess_data"""
+    import polars as pl
+
+    from src.text_cleaning import clean_text_batch, clean_text_expr
+
+    slices = [df.slice(offset, options["batch_size"]) for offset in range(0, len(df), options["batch_size"])]
+    if engine == "polars":
+        def preprocess(batch):
+            return batch.with_columns(clean_text_expr(pl.col("text")).alias("cleaned_text"))
+    else:
+        def preprocess(batch):
+            return batch.with_columns(pl.Series("cleaned_text", clean_text_batch(batch["text"].to_list())))
+    return _timed_calls(preprocess, slices, len(df))
+
+
+def _bench_preprocess_data(df, options, engine: str) -> Dict[str, Any]:
+    """端到端运行 preprocess_data（NLTK 数据检查、清洗、过滤空文本）；计时前先下载好 NLTK 数据，计时中不会联网"""
+    from src.data_processing import download_nltk_data, preprocess_data
+
+    download_nltk_data()
+    return _timed_calls(
+        lambda corpus: preprocess_data(corpus, batch_size=options["batch_size"], engine=engine), [df], len(df)
+    )
+
+
+def _bench_vectorizer_transform(df, options) -> Dict[str, Any]:
+    from src.text_cleaning import clean_text_batch
+
+    vectorizer = _load_classifier().tfidf
+    cleaned = clean_text_batch(df["text"].to_list())
+    return _timed_calls(vectorizer.transform, _batches(cleaned, options["batch_size"]), len(cleaned))
+
+
+def _bench_predict(df, options, model_name: str) -> Dict[str, Any]:
+    classifier = _load_classifier()
+    texts = df["text"].to_list()[:options["samples"]]
+    classifier.predict(model_name, texts[0])  # 预热：触发模型的延迟加载
+    return _timed_calls(lambda text: classifier.predict(model_name, text), texts, len(texts))
+
+
+def _bench_predict_batch(df, options, model_name: str) -> Dict[str, Any]:
+    classifier = _load_classifier()
+    texts = df["text"].to_list()
+    classifier.predict(model_name, texts[0])
+    return _timed_calls(
+        lambda batch: classifier.predict_batch(model_name, batch), _batches(texts, options["batch_size"]), len(texts)
+    )
+
+
+def _bench_load_models(options) -> Dict[str, Any]:
+    """冷启动：导入 src.models、登记模型并完成每个模型的第一次预测"""
+    start = time.perf_counter()
+    classifier = _load_classifier()
+    timings = {"import_and_register_s": time.perf_counter() - start}
+    for model_name in options["models"]:
+        t0 = time.perf_counter()
+        classifier.predict(model_name, "free entry to win a prize")
+        timings[f"first_predict_{model_name}_s"] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+    result = _summarize([elapsed], len(options["models"]), elapsed)
+    result["breakdown"] = timings
+    return result
+
+
+def _run_stage(stage: str, scale: int, model_name: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """在子进程中执行：构建语料并运行单个阶段"""
+    if stage == "load_models":
+        result = _bench_load_models(options)
+    else:
+        df = build_corpus(scale, options["seed"])
+        rss_before = _peak_rss_mb()
+        if stage == "clean_text":
+            result = _bench_clean_text(df, options)
+        elif stage == "preprocess_polars":
+            result = _bench_preprocess(df, options, "polars")
+        elif stage == "preprocess_python":
+            result = _bench_preprocess(df, options, "python")
+        elif stage == "preprocess_data_polars":
+            result = _bench_preprocess_data(df, options, "polars")
+        elif stage == "preprocess_data_python":
+            result = _bench_preprocess_data(df, options, "python")
+        elif stage == "vectorizer_transform":
+            result = _bench_vectorizer_transform(df, options)
+        elif stage == "predict":
+            result = _bench_predict(df, options, model_name)
+        elif stage == "predict_batch":
+            result = _bench_predict_batch(df, options, model_name)
+        else:
+            raise ValueError(f"未知的基准阶段: {stage}")
+        result["corpus_rss_mb"] = rss_before
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _metadata(options: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {}
+    for package in ("numpy", "polars", "sklearn", "lightgbm"):
+        try:
+            versions[package] = __import__(package).__version__
+        except ImportError:
+            versions[package] = None
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "versions": versions,
+        "options": options,
+    }
+
+
+def run_benchmarks(
+    stages: List[str],
+    scales: List[int],
+    models: List[str],
+    samples: int = 10_000,
+    batch_size: int = 1000,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    options = {"samples": samples, "batch_size": batch_size, "seed": seed, "models": list(models)}
+    report = {"meta": _metadata(options), "results": []}
+
+    jobs = []
+    for stage in stages:
+        # load_models 与语料规模无关，只在最小规模下运行一次
+        stage_scales = scales[:1] if stage == "load_models" else scales
+        stage_models = models if stage in ("predict", "predict_batch") else [None]
+        jobs.extend((stage, scale, model_name) for scale in stage_scales for model_name in stage_models)
+
+    for stage, scale, model_name in jobs:
+        label = f"{stage}[{model_name}]" if model_name else stage
+        print(f"   运行 {label} @ {scale}x ...", flush=True)
+        # 每个阶段使用全新的 spawn 进程，峰值 RSS 只反映该阶段
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            try:
+                result = pool.submit(_run_stage, stage, scale, model_name, options).result()
+            except Exception as e:
+                print(f"   跳过 {label} @ {scale}x: {e}")
+                continue
+
+        result.update({"stage": stage, "scale": scale, "model": model_name})
+        report["results"].append(result)
+        throughput = result["throughput_per_s"]
+        print(
+            f"      吞吐量 {throughput:,.0f}/s  p50 {result['latency_ms']['p50']:.3f}ms  "
+            f"p99 {result['latency_ms']['p99']:.3f}ms  峰值 RSS {result['peak_rss_mb'] or 0:.0f}MB"
+        )
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """对比两份报告，返回吞吐量下降或 p99 延迟上升超过 tolerance 的阶段"""
+    def key(result):
+        return result["stage"], result["scale"], result.get("model")
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = baseline_results.get(key(result))
+        if old is None:
+            continue
+        name = "{}[{}] @ {}x".format(result["stage"], result.get("model") or "-", result["scale"])
+        if old["throughput_per_s"] and result["throughput_per_s"] < old["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: 吞吐量 {old['throughput_per_s']:,.0f}/s -> {result['throughput_per_s']:,.0f}/s")
+        if result["latency_ms"]["p99"] > old["latency_ms"]["p99"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {old['latency_ms']['p99']:.3f}ms -> {result['latency_ms']['p99']:.3f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练与推理路径的延迟/吞吐量基准测试")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES, help="要运行的阶段")
+    parser.add_argument("--scales", nargs="+", type=int, default=list(DEFAULT_SCALES), help="语料规模倍数")
+    parser.add_argument("--models", nargs="+", default=list(DEFAULT_MODELS), help="参与预测阶段的模型")
+    parser.add_argument("--samples", type=int, default=10_000, help="单条延迟阶段最多测量的短信数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="批处理阶段的批大小")
+    parser.add_argument("--seed", type=int, default=42, help="合成语料的随机种子")
+    parser.add_argument("--output", type=Path, default=None, help="结果 JSON 路径，默认写入 data/benchmarks/")
+    parser.add_argument("--compare", type=Path, default=None, help="与基线 JSON 对比，出现回归时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的性能波动比例")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("基准测试")
+    print("=" * 50)
+    report = run_benchmarks(args.stages, args.scales, args.models, args.samples, args.batch_size, args.seed)
+
+    output = args.output
+    if output is None:
+        BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+        output = BENCHMARK_DIR / f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=float)
+    print(f"\n结果已保存到 {output}")
+
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.tolerance)
+        if regressions:
+            print("\n检测到性能回归:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print("\n未检测到性能回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+class SQLiteStore:
+    """基于 SQLite 的共享磁盘缓存，多个进程可以同时读写同一个文件"""
+
+    def __init__(self, path: Path, ttl: Optional[float] = None, prune_every: int = 1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, ts REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, ts FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._writes += 1
+            if self.ttl is not None and self._writes % self.prune_every == 0:
+                self._conn.execute("DELETE FROM cache WHERE ts < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+class LRUCache:
+    """线程安全的内存 LRU 缓存，支持 TTL 过期和可选的 SQLiteStore 二级缓存"""
+
+    def __init__(self, maxsize: int = 10_000, ttl: Optional[float] = 3600, store: Optional[SQLiteStore] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if self.ttl is None or now - entry[0] <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+
+        value = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._put(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._put(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def _put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class PredictionCache(LRUCache):
+    """预测结果缓存，键为模型版本、模型名称和 clean_text 之后的文本，值为垃圾短信概率
+
+    版本号是键的一部分：热切换后旧版本的条目不会被新版本读到，随 TTL 或 LRU 自然淘汰，
+    无需清空可能被多个进程共享的缓存。
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: Optional[float] = 3600, path: Optional[Path] = None):
+        store = SQLiteStore(path, ttl=ttl) if path is not None else None
+        super().__init__(maxsize=maxsize, ttl=ttl, store=store)
+
+    @staticmethod
+    def make_key(model_name: str, cleaned_text: str, version: Optional[str] = None) -> str:
+        return f"{version or ''}\x00{model_name}\x00{cleaned_text}"
+
+    def get_probability(self, model_name: str, cleaned_text: str, version: Optional[str] = None) -> Optional[float]:
+        value = self.get(self.make_key(model_name, cleaned_text, version))
+        return float(value) if value is not None else None
+
+    def set_probability(self, model_name: str, cleaned_text: str, probability: float, version: Optional[str] = None):
+        self.set(self.make_key(model_name, cleaned_text, version), float(probability))
+
+
+class TranslationCache(LRUCache):
+    """翻译结果缓存，键为原文；默认不过期，可持久化到 SQLite 文件"""
+
+    def __init__(self, maxsize: int = 100_000, ttl: Optional[float] = None, path: Optional[Path] = None):
+        store = SQLiteStore(path, ttl=ttl) if path is not None else None
+        super().__init__(maxsize=maxsize, ttl=ttl, store=store)
+
+    def get_translation(self, text: str) -> Optional[str]:
+        return self.get(text)
+
+    def set_translation(self, text: str, translated_text: str):
+        self.set(text, translated_text)
@@ -42,86 +42,6 @@ def loading_animation():
     """, unsafe_allow_html=True)
 
 
-def result_card(prediction, analysis):
-    """结果卡片组件（翻转效果）"""
-    if prediction.is_spam:
-        st.toast("🚨 检测到垃圾短信！", icon="⚠️")
-        icon = "🚨"
-        status = "垃圾短信"
-        back_status = "高风险"
-        back_color = "var(--danger)"
-    else:
-        st.toast("✅ 短信安全", icon="🛡️")
-        icon = "✅"
-        status = "正常短信"
-        back_status = "安全"
-        back_color = "var(--success)"
-    
-    st.markdown(f"""
-    <div class="flip-card">
-        <div class="flip-card-inner">
-            <div class="flip-card-front">
-                <h2>{icon} {status}</h2>
-                <p style="font-size: 1.5rem; margin: 0.5rem 0;">
-                    概率: <strong>{prediction.probability:.2%}</strong>
-                </p>
-                <p style="color: var(--text-secondary); margin: 0;">
-                    使用模型: <strong>{prediction.model_used.upper()}</strong>
-                </p>
-            </div>
-            <div class="flip-card-back">
-                <h2>🤖 LLM 分析</h2>
-                <h3>📋 摘要</h3>
-                <p>{analysis.summary}</p>
-                
-                <h3>⚠️ 风险因素</h3>
-                <ul>
-    """, unsafe_allow_html=True)
-    
-    for factor in analysis.risk_factors:
-        st.markdown(f"<li>{factor}</li>", unsafe_allow_html=True)
-    
-    st.markdown("""
-                </ul>
-                
-                <h3>💡 解释</h3>
-                <p>{analysis.explanation}</p>
-                
-                <h3>🎯 行动建议</h3>
-                <p style="color: {back_color}; font-weight: 600;">{analysis.action_suggestion}</p>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-
-def analysis_card(analysis):
-    """LLM 分析卡片组件"""
-    with st.expander("🤖 LLM 分析报告", expanded=False):
-        st.markdown("""
-        <div class="result-card">
-            <h3>📋 摘要</h3>
-            <p>{analysis.summary}</p>
-            
-            <h3>⚠️ 风险因素</h3>
-            <ul>
-        """, unsafe_allow_html=True)
-        
-        for factor in analysis.risk_factors:
-            st.markdown(f"<li>{factor}</li>", unsafe_allow_html=True)
-        
-        st.markdown("""
-            </ul>
-            
-            <h3>💡 解释</h3>
-            <p>{analysis.explanation}</p>
-            
-            <h3>🎯 行动建议</h3>
-            <p style="color: var(--success); font-weight: 600;">{analysis.action_suggestion}</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-
 def comparison_card(comparison):
     """模型对比卡片组件"""
     col_a, col_b = st.columns(2)
@@ -172,6 +92,10 @@ def comparison_card(comparison):
             </div>
             """, unsafe_allow_html=True)
     
+    ensemble = comparison.get("ensemble")
+    if ensemble is not None:
+        st.caption(f"集成模型综合概率: {ensemble['probability']:.2%}（{'垃圾短信' if ensemble['is_spam'] else '正常短信'}）")
+
     if comparison["agreement"]:
         st.markdown("""
         <div class="result-card success">
@@ -1,8 +1,7 @@
-import re
-import string
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional
 
 import nltk
 import polars as pl
@@ -10,6 +9,8 @@ import pandera as pa
 from pandera.typing import DataFrame, Series
 from tqdm import tqdm
 
+from src.text_cleaning import clean_text_batch, clean_text_expr
+
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
@@ -21,26 +22,44 @@ class SpamSchema(pa.DataFrameModel):
     text: Series[str] = pa.Field(nullable=False)
 
 
+NLTK_RESOURCES = {"punkt": "tokenizers/punkt", "stopwords": "corpora/stopwords", "wordnet": "corpora/wordnet"}
+
+
 def download_nltk_data():
+    """只下载本地还没有的 NLTK 数据；nltk.download 每次都会联网检查索引，数据已存在时跳过它"""
     try:
-        nltk.download("punkt", quiet=True)
-        nltk.download("stopwords", quiet=True)
-        nltk.download("wordnet", quiet=True)
+        for package, resource in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                nltk.download(package, quiet=True)
     except Exception as e:
         print(f"   警告: NLTK 数据下载失败 ({e})，将跳过 NLTK 功能")
 
 
-def clean_text(text: str) -> str:
-    text = text.lower()
-    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
-    text = re.sub(r"[0-9]+", "", text)
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+def clean_text_parallel(
+    texts: List[str],
+    batch_size: int = 1000,
+    n_workers: Optional[int] = None,
+    executor: str = "process",
+) -> List[str]:
+    """按批次并行清洗文本，结果顺序与输入一致"""
+    n_workers = n_workers or os.cpu_count() or 1
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
 
+    if executor == "process":
+        pool_cls = ProcessPoolExecutor
+    elif executor == "thread":
+        pool_cls = ThreadPoolExecutor
+    else:
+        raise ValueError(f"未知的执行器类型: {executor}")
 
-def clean_text_batch(texts: List[str]) -> List[str]:
-    return [clean_text(text) for text in texts]
+    cleaned_texts = []
+    with pool_cls(max_workers=n_workers) as pool:
+        results = pool.map(clean_text_batch, batches)
+        for cleaned_batch in tqdm(results, total=len(batches), desc=f"   预处理进度 ({n_workers} workers)"):
+            cleaned_texts.extend(cleaned_batch)
+    return cleaned_texts
 
 
 def load_data() -> pl.DataFrame:
@@ -49,54 +68,119 @@ def load_data() -> pl.DataFrame:
     return df
 
 
+def iter_csv_batches(
+    path: Path,
+    batch_size: int = 100_000,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pl.DataFrame]:
+    """以流式方式分块读取 CSV，块大小约为 batch_size 行，顺序与文件一致
+
+    新版本 polars 使用 LazyFrame.collect_batches；没有该方法的旧版本使用 pl.read_csv_batched，
+    两者都只顺序扫描文件一遍。
+    """
+    lazy = pl.scan_csv(path, encoding="utf8-lossy")
+    if hasattr(lazy, "collect_batches"):
+        if columns is not None:
+            lazy = lazy.select(columns)
+        for df in lazy.collect_batches(chunk_size=batch_size, maintain_order=True):
+            if len(df) > 0:
+                yield df
+        return
+
+    reader = pl.read_csv_batched(path, batch_size=batch_size, columns=columns, encoding="utf8-lossy")
+    while batches := reader.next_batches(1):
+        for df in batches:
+            if len(df) > 0:
+                yield df
+
+
+def iter_data_batches(
+    batch_size: int = 100_000,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    path: Optional[Path] = None,
+) -> Iterator[pl.DataFrame]:
+    """分批读取原始 CSV 并完成清洗、标签编码和训练/测试划分，不将全量数据载入内存
+
+    每行按行号哈希决定是否属于测试集，因此多次遍历得到的划分完全一致。
+    """
+    test_buckets = int(test_size * 10_000)
+    offset = 0
+    for df in iter_csv_batches(path or ARCHIVE_DIR / "spam.csv", batch_size, columns=["v1", "v2"]):
+        df = df.rename({"v1": "label", "v2": "text"}).with_row_index("row_id", offset=offset)
+        offset += len(df)
+        df = df.with_columns(
+            clean_text_expr(pl.col("text")).alias("cleaned_text"),
+            (pl.col("label") == "spam").cast(pl.Int32).alias("label_encoded"),
+            (pl.col("row_id").hash(random_state) % 10_000 < test_buckets).alias("is_test"),
+        )
+        yield df.filter(pl.col("cleaned_text").str.len_chars() > 0)
+
+
 def validate_data(df: pl.DataFrame) -> pl.DataFrame:
     pandas_df = df.to_pandas()
     SpamSchema.validate(pandas_df)
     return df
 
 
-def preprocess_data(df: pl.DataFrame, batch_size: int = 1000) -> pl.DataFrame:
+def preprocess_data(
+    df: pl.DataFrame,
+    batch_size: int = 1000,
+    engine: str = "polars",
+    n_workers: Optional[int] = None,
+    executor: str = "process",
+) -> pl.DataFrame:
+    """n_workers 和 executor 只对 python 引擎生效；polars 引擎本身已在 Rust 线程池中并行"""
     download_nltk_data()
-    
-    texts = df["text"].to_list()
-    total = len(texts)
-    
-    cleaned_texts = []
-    
+
     print("   开始预处理文本...")
-    for i in tqdm(range(0, total, batch_size), desc="   预处理进度"):
-        batch = texts[i:i + batch_size]
-        cleaned_batch = clean_text_batch(batch)
-        cleaned_texts.extend(cleaned_batch)
-    
-    df = df.with_columns(
-        pl.Series("cleaned_text", cleaned_texts)
-    )
+    if engine == "polars":
+        if n_workers is not None and n_workers > 1:
+            print(f"   警告: polars 引擎自动使用全部 CPU，忽略 n_workers={n_workers}（只对 python 引擎生效）")
+        df = df.with_columns(clean_text_expr(pl.col("text")).alias("cleaned_text"))
+    elif engine == "python":
+        texts = df["text"].to_list()
+        total = len(texts)
+
+        if n_workers is not None and n_workers > 1:
+            cleaned_texts = clean_text_parallel(texts, batch_size, n_workers, executor)
+        else:
+            cleaned_texts = []
+            for i in tqdm(range(0, total, batch_size), desc="   预处理进度"):
+                batch = texts[i:i + batch_size]
+                cleaned_batch = clean_text_batch(batch)
+                cleaned_texts.extend(cleaned_batch)
+
+        df = df.with_columns(
+            pl.Series("cleaned_text", cleaned_texts)
+        )
+    else:
+        raise ValueError(f"未知的预处理引擎: {engine}")
+
     df = df.filter(pl.col("cleaned_text").str.len_chars() > 0)
     
     print(f"   预处理完成，剩余 {len(df)} 条数据")
     return df
 
 
-def save_processed_data(df: pl.DataFrame, filename: str = "processed_spam.csv"):
+_IPC_SUFFIXES = {".arrow", ".ipc", ".feather"}
+
+
+def save_processed_data(df: pl.DataFrame, filename: str = "processed_spam.parquet") -> Path:
+    """保存为列式格式：.parquet 写 Parquet，.arrow/.ipc/.feather 写未压缩的 Arrow IPC（可内存映射）"""
     output_path = DATA_DIR / filename
-    original_cwd = os.getcwd()
-    try:
-        os.chdir(DATA_DIR)
-        df.write_csv(filename)
-    finally:
-        os.chdir(original_cwd)
+    if output_path.suffix in _IPC_SUFFIXES:
+        df.write_ipc(output_path, compression="uncompressed")
+    else:
+        df.write_parquet(output_path)
     return output_path
 
 
-def load_processed_data(filename: str = "processed_spam.csv") -> pl.DataFrame:
+def load_processed_data(filename: str = "processed_spam.parquet", memory_map: bool = True) -> pl.DataFrame:
     output_path = DATA_DIR / filename
-    original_cwd = os.getcwd()
-    try:
-        os.chdir(DATA_DIR)
-        return pl.read_csv(filename, encoding="utf-8-lossy")
-    finally:
-        os.chdir(original_cwd)
+    if output_path.suffix in _IPC_SUFFIXES:
+        return pl.read_ipc(output_path, memory_map=memory_map)
+    return pl.read_parquet(output_path, memory_map=memory_map)
 
 
 def prepare_train_test_split(df: pl.DataFrame, test_size: float = 0.2, random_state: int = 42):
@@ -0,0 +1,113 @@
+import math
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+
+class LinearScorer:
+    """从 TfidfVectorizer + 线性分类器的 Pipeline 导出的纯 Python 打分器
+
+    词表被展开成 term -> (idf, 系数 × idf) 的哈希表，对清洗后的文本只遍历一次 n-gram
+    就能得到与 Pipeline.predict_proba 在浮点误差内一致的垃圾短信概率，省去 sklearn 的参数校验和稀疏矩阵构造。
+    """
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        table: Dict[str, Tuple[float, float]],
+        bias: float,
+        norm: Optional[str] = "l2",
+        sublinear_tf: bool = False,
+        binary: bool = False,
+    ):
+        self.analyzer = analyzer
+        self.table = table
+        self.bias = bias
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+
+    @classmethod
+    def from_pipeline(cls, pipeline: "Pipeline") -> Optional["LinearScorer"]:
+        """不支持的 Pipeline 结构（非 TfidfVectorizer、多分类、非 log_loss 等）返回 None，调用方应回退到 sklearn"""
+        # 调用方已经持有 sklearn 对象，此时导入没有额外开销
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.pipeline import Pipeline
+
+        if not isinstance(pipeline, Pipeline) or len(pipeline) != 2:
+            return None
+        vectorizer, clf = pipeline[0], pipeline[-1]
+        if type(vectorizer) is not TfidfVectorizer or not hasattr(vectorizer, "vocabulary_"):
+            return None
+        if not callable(vectorizer.analyzer) and vectorizer.analyzer not in ("word", "char", "char_wb"):
+            return None
+        if vectorizer.norm not in ("l1", "l2", None):
+            return None
+        if not hasattr(clf, "coef_") or clf.coef_.shape[0] != 1 or getattr(clf, "loss", "log_loss") != "log_loss":
+            return None
+
+        coef = np.asarray(clf.coef_[0], dtype=np.float64)
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else np.ones_like(coef)
+        table = {
+            term: (float(idf[index]), float(coef[index] * idf[index]))
+            for term, index in vectorizer.vocabulary_.items()
+        }
+        return cls(
+            analyzer=vectorizer.build_analyzer(),
+            table=table,
+            bias=float(clf.intercept_[0]),
+            norm=vectorizer.norm,
+            sublinear_tf=vectorizer.sublinear_tf,
+            binary=vectorizer.binary,
+        )
+
+    def decision_function(self, cleaned_text: str) -> float:
+        dot = 0.0
+        total = 0.0
+        table = self.table
+        for term, count in Counter(self.analyzer(cleaned_text)).items():
+            entry = table.get(term)
+            if entry is None:
+                continue
+            tf = 1.0 if self.binary else (1.0 + math.log(count) if self.sublinear_tf else float(count))
+            dot += tf * entry[1]
+            value = tf * entry[0]
+            total += value * value if self.norm == "l2" else abs(value)
+
+        if self.norm is not None and total > 0:
+            dot /= math.sqrt(total) if self.norm == "l2" else total
+        return dot + self.bias
+
+    def contributions(self, cleaned_text: str) -> Dict[str, float]:
+        """各 n-gram 对 decision_function 的贡献，与 Pipeline 中 系数 × 归一化后的 tf-idf 值一致（不含偏置项）"""
+        weighted = {}
+        total = 0.0
+        table = self.table
+        for term, count in Counter(self.analyzer(cleaned_text)).items():
+            entry = table.get(term)
+            if entry is None:
+                continue
+            tf = 1.0 if self.binary else (1.0 + math.log(count) if self.sublinear_tf else float(count))
+            weighted[term] = tf * entry[1]
+            value = tf * entry[0]
+            total += value * value if self.norm == "l2" else abs(value)
+
+        if self.norm is not None and total > 0:
+            scale = math.sqrt(total) if self.norm == "l2" else total
+            weighted = {term: weight / scale for term, weight in weighted.items()}
+        return weighted
+
+    def score(self, cleaned_text: str) -> float:
+        z = self.decision_function(cleaned_text)
+        # 分两支计算 sigmoid，避免 exp 溢出
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def predict_proba(self, cleaned_texts: List[str]) -> np.ndarray:
+        return np.fromiter((self.score(text) for text in cleaned_texts), dtype=np.float64, count=len(cleaned_texts))
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import polars as pl
+import scipy.sparse as sp
+import sklearn
+
+from src.data_processing import DATA_DIR, CLEAN_TEXT_VERSION
+
+CACHE_DIR = DATA_DIR / "cache"
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class FeatureCache:
+    """按内容寻址的特征缓存：清洗后的文本存为 Parquet，TF-IDF 矩阵存为 scipy .npz
+
+    键由输入文件哈希、clean_text 版本和向量化器参数共同决定，任何一项变化都会生成新的条目。
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def cleaned_key(self, source: Path) -> str:
+        return cache_key("cleaned", file_digest(source), CLEAN_TEXT_VERSION, pl.__version__)
+
+    def features_key(self, data_key: str, vectorizer_params: Dict[str, Any]) -> str:
+        return cache_key("features", data_key, vectorizer_params, sklearn.__version__)
+
+    def load_cleaned(self, key: str) -> Optional[pl.DataFrame]:
+        path = self.cache_dir / f"cleaned-{key}.parquet"
+        if not path.exists():
+            return None
+        return pl.read_parquet(path)
+
+    def save_cleaned(self, key: str, df: pl.DataFrame) -> Path:
+        path = self.cache_dir / f"cleaned-{key}.parquet"
+        self._atomic_write(path, df.write_parquet)
+        return path
+
+    def load_features(self, key: str) -> Optional[Tuple[Any, sp.csr_matrix, sp.csr_matrix]]:
+        entry = self.cache_dir / f"features-{key}"
+        if not (entry / "COMPLETE").exists():
+            return None
+        vectorizer = joblib.load(entry / "vectorizer.joblib")
+        X_train = sp.load_npz(entry / "X_train.npz").tocsr()
+        X_test = sp.load_npz(entry / "X_test.npz").tocsr()
+        return vectorizer, X_train, X_test
+
+    def save_features(self, key: str, vectorizer: Any, X_train: sp.spmatrix, X_test: sp.spmatrix) -> Path:
+        entry = self.cache_dir / f"features-{key}"
+        entry.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(entry / "vectorizer.joblib", lambda p: joblib.dump(vectorizer, p))
+        self._atomic_write(entry / "X_train.npz", lambda p: sp.save_npz(p, X_train))
+        self._atomic_write(entry / "X_test.npz", lambda p: sp.save_npz(p, X_test))
+        (entry / "COMPLETE").touch()
+        return entry
+
+    def _atomic_write(self, path: Path, writer) -> None:
+        # 先写入同目录下的临时文件再重命名，避免并发读取到半写入的缓存
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=path.suffix)
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+
+from src.data_processing import DATA_DIR
+from src.text_cleaning import clean_text_expr
+
+FEEDBACK_DIR = DATA_DIR / "feedback"
+STATE_FILE = "state.json"
+VALID_LABELS = ("ham", "spam")
+
+
+class FeedbackStore:
+    """用户反馈的标注短信，按追加方式写成多个 Parquet 分片
+
+    state.json 记录增量更新已经消费到的时间点，train.py update 只读取之后的新反馈；
+    更新后的版本因指标下降未被切换时，这批反馈保持待处理，并记录被拦截的版本和原因。
+    文本应为模型使用的语言（英文），中文短信需先翻译。
+    """
+
+    def __init__(self, root: Path = FEEDBACK_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def add(self, texts: List[str], labels: List[str], source: str = "user_report") -> int:
+        if len(texts) != len(labels):
+            raise ValueError("texts 和 labels 的长度必须一致")
+        invalid = sorted({label for label in labels if label not in VALID_LABELS})
+        if invalid:
+            raise ValueError(f"未知的标签: {invalid}（只支持 ham / spam）")
+        if not texts:
+            return 0
+
+        df = pl.DataFrame({
+            "text": texts,
+            "label": labels,
+            "source": [source] * len(texts),
+            "created_at": [datetime.now()] * len(texts),
+        })
+        path = self.root / f"part-{datetime.now():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet"
+        # 先写临时文件再重命名，读取方不会看到半写入的分片
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.write_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return len(df)
+
+    def _parts(self) -> List[Path]:
+        return sorted(self.root.glob("part-*.parquet"))
+
+    def load(self, since: Optional[datetime] = None) -> pl.DataFrame:
+        parts = self._parts()
+        if not parts:
+            return pl.DataFrame(schema={"text": pl.Utf8, "label": pl.Utf8, "source": pl.Utf8, "created_at": pl.Datetime})
+        lazy = pl.scan_parquet(parts)
+        if since is not None:
+            lazy = lazy.filter(pl.col("created_at") > since)
+        return lazy.sort("created_at").collect()
+
+    def _read_state(self) -> Dict[str, Any]:
+        path = self.root / STATE_FILE
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_state(self, state: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.root / STATE_FILE)
+
+    def consumed_until(self) -> Optional[datetime]:
+        value = self._read_state().get("consumed_until")
+        return datetime.fromisoformat(value) if value else None
+
+    def mark_consumed(self, until: datetime):
+        """新版本切换成功后调用：until 及之前的反馈不再参与后续更新"""
+        self._write_state({"consumed_until": until.isoformat()})
+
+    def blocked(self) -> Optional[Dict[str, Any]]:
+        """最近一次被拦截的更新：{"until", "version", "reason"}，没有时为 None"""
+        return self._read_state().get("blocked")
+
+    def mark_blocked(self, until: datetime, version: str, reason: str):
+        """更新后的版本未被切换：反馈保持待处理，记录拦截的版本和原因"""
+        state = self._read_state()
+        state["blocked"] = {"until": until.isoformat(), "version": version, "reason": reason}
+        self._write_state(state)
+
+    def pending(self) -> pl.DataFrame:
+        return self.load(since=self.consumed_until())
+
+    def compact(self) -> Optional[Path]:
+        """把所有分片合并成一个文件，避免长期运行后产生大量小文件"""
+        parts = self._parts()
+        if len(parts) <= 1:
+            return None
+        # 只合并此刻已有的分片，合并期间新写入的分片保留到下一次
+        df = pl.scan_parquet(parts).sort("created_at").collect()
+        path = self.root / f"part-{datetime.now():%Y%m%d%H%M%S%f}-compacted.parquet"
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        for part in parts:
+            part.unlink(missing_ok=True)
+        return path
+
+
+def prepare_feedback(df: pl.DataFrame) -> pl.DataFrame:
+    """清洗反馈文本并编码标签，得到与训练数据相同的 cleaned_text / label_encoded 列"""
+    return df.with_columns(
+        clean_text_expr(pl.col("text")).alias("cleaned_text"),
+        (pl.col("label") == "spam").cast(pl.Int32).alias("label_encoded"),
+    ).filter(pl.col("cleaned_text").str.len_chars() > 0)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="用户反馈数据管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_parser = subparsers.add_parser("add", help="添加一条标注短信")
+    add_parser.add_argument("--text", type=str, required=True, help="短信内容")
+    add_parser.add_argument("--label", type=str, required=True, choices=VALID_LABELS, help="标签")
+    import_parser = subparsers.add_parser("import", help="从 CSV / Parquet 文件导入标注短信（需包含 text 和 label 列）")
+    import_parser.add_argument("path", type=Path, help="输入文件")
+    import_parser.add_argument("--source", type=str, default="import", help="来源标记")
+    subparsers.add_parser("status", help="查看反馈数据量和待处理条数")
+    args = parser.parse_args()
+
+    store = FeedbackStore()
+    if args.command == "add":
+        store.add([args.text], [args.label])
+        print("已添加 1 条反馈")
+    elif args.command == "import":
+        df = pl.read_parquet(args.path) if args.path.suffix == ".parquet" else pl.read_csv(args.path)
+        n_added = store.add(df["text"].to_list(), df["label"].to_list(), source=args.source)
+        print(f"已导入 {n_added} 条反馈")
+    else:
+        total, pending = len(store.load()), len(store.pending())
+        print(f"反馈总数: {total}，待增量更新: {pending}，已处理到: {store.consumed_until() or '-'}")
+        blocked = store.blocked()
+        if blocked:
+            print(f"截至 {blocked['until']} 的反馈生成的版本 {blocked['version']} 未被切换: {blocked['reason']}")
+
+
+if __name__ == "__main__":
+    main()
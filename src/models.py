@@ -1,70 +1,385 @@
-import joblib
+import copy
+import functools
+import gzip
+import json
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from pathlib import Path
-from typing import Tuple, Dict, Any
+from typing import TYPE_CHECKING, Tuple, Dict, Any, List, Callable, Iterable, Iterator, Optional
 
-import lightgbm as lgb
+import joblib
 import numpy as np
 import polars as pl
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score, f1_score
-from sklearn.pipeline import Pipeline
+
+from src import telemetry
+from src.fast_scorer import LinearScorer
+from src.text_cleaning import clean_text_batch
+
+# sklearn 和 lightgbm 只在训练、加载或反序列化对应对象时才导入，缩短服务冷启动时间
+if TYPE_CHECKING:
+    import lightgbm as lgb
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.pipeline import Pipeline
+    from src.cache import PredictionCache
+    from src.feature_cache import FeatureCache
 
 MODEL_DIR = Path(__file__).parent.parent / "models"
 MODEL_DIR.mkdir(exist_ok=True)
 
+# 紧凑格式：词表 + idf 向量、线性模型系数、LightGBM 原生文本模型
+VECTORIZER_COMPACT_FILE = "tfidf_vocab.npz"
+LINEAR_COMPACT_FILE = "{name}_linear.npz"
+LIGHTGBM_NATIVE_FILE = "{name}_model.txt.gz"
+JOBLIB_MODEL_FILE = "{name}_model.joblib"
+THRESHOLDS_FILE = "thresholds.json"
+ENSEMBLE_FILE = "ensemble.json"
+ENSEMBLE_NAME = "ensemble"
+
+# 概率 >= 阈值即判为垃圾短信；未单独设置阈值的模型使用默认值
+DEFAULT_THRESHOLD = 0.5
+
+# 默认超参数；构造 SpamClassifier 时传入的参数会覆盖同名项（可用 train.py tune 搜索）
+DEFAULT_TFIDF_PARAMS = {"max_features": 5000, "ngram_range": (1, 2)}
+DEFAULT_LOGREG_PARAMS = {"max_iter": 1000, "random_state": 42, "class_weight": "balanced"}
+DEFAULT_LGBM_PARAMS = {
+    "n_estimators": 100, "learning_rate": 0.1, "max_depth": -1, "random_state": 42, "class_weight": "balanced",
+    "verbose": -1,
+}
+
+_COMPACT_VECTORIZER_PARAMS = (
+    "analyzer", "binary", "lowercase", "ngram_range", "norm", "smooth_idf", "strip_accents",
+    "sublinear_tf", "token_pattern", "use_idf",
+)
+
+# 流式训练中 LightGBM 训练样本的行数上限，决定流式训练的峰值内存（见 train_streaming）
+STREAMING_LGBM_MAX_ROWS = 500_000
+
+# 特征后端：tfidf 保存完整词表；hashing 用 HashingVectorizer + TfidfTransformer，内存和模型文件大小与词表规模无关
+FEATURE_BACKENDS = ("tfidf", "hashing")
+HASHING_N_FEATURES = 2 ** 18
+# hashing 后端只使用下面这些向量化参数，max_features / min_df / max_df 等依赖词表的参数会被忽略
+_HASHING_PARAMS = ("analyzer", "binary", "lowercase", "n_features", "ngram_range", "strip_accents", "token_pattern")
+_IDF_PARAMS = ("norm", "smooth_idf", "sublinear_tf", "use_idf")
+# explain 为 hashing 后端记录的最近 n-gram 数量上限
+TERM_INDEX_SIZE = 50_000
+# explain_batch 中 LightGBM 每次 pred_contrib 的行数，SHAP 结果为稠密矩阵（行数 × 特征数）
+EXPLAIN_CHUNK_SIZE = 256
+
+
+def _is_pipeline(obj) -> bool:
+    # sklearn.pipeline 尚未导入时不可能存在 Pipeline 实例，类型判断不应触发 sklearn 的导入
+    module = sys.modules.get("sklearn.pipeline")
+    return module is not None and isinstance(obj, module.Pipeline)
+
+
+def build_hashing_vectorizer(params: Dict[str, Any]) -> "Pipeline":
+    """HashingVectorizer（只计词频）+ TfidfTransformer，对外提供与 TfidfVectorizer 相同的 fit/transform 接口"""
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import Pipeline
+
+    hash_params = {key: params[key] for key in _HASHING_PARAMS if key in params}
+    hash_params.setdefault("n_features", HASHING_N_FEATURES)
+    idf_params = {key: params[key] for key in _IDF_PARAMS if key in params}
+    return Pipeline([
+        ("hash", HashingVectorizer(alternate_sign=False, norm=None, **hash_params)),
+        ("idf", TfidfTransformer(**idf_params)),
+    ])
+
+
+def is_hashing_vectorizer(vectorizer) -> bool:
+    if not _is_pipeline(vectorizer):
+        return False
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+    return (
+        isinstance(vectorizer[0], HashingVectorizer)
+        and isinstance(vectorizer[-1], TfidfTransformer)
+    )
+
+
+def _drop_stop_words(vectorizer):
+    # stop_words_ 记录所有被 max_features / min_df 裁掉的 n-gram，只用于排查，随语料增长且不影响 transform
+    if getattr(vectorizer, "stop_words_", None) is not None:
+        vectorizer.stop_words_ = None
+
+
+class HashedTermIndex:
+    """hashing 后端的反向索引：记录最近见过的 n-gram 对应的特征列，只用于解释输出
+
+    容量有上限（LRU），内存不随语料增长；发生哈希冲突时保留最近一次出现的 n-gram。
+    """
+
+    def __init__(self, hasher: "HashingVectorizer", max_terms: int = TERM_INDEX_SIZE):
+        from sklearn.utils import murmurhash3_32
+
+        self._hash = murmurhash3_32
+        self.analyzer = hasher.build_analyzer()
+        self.n_features = hasher.n_features
+        self.max_terms = max_terms
+        self._terms: "OrderedDict[int, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _column(self, term: str) -> int:
+        # 与 sklearn 的 _hashing_transform 相同：有符号 murmurhash3 取绝对值后对 n_features 取模
+        h = self._hash(term, seed=0)
+        if h == -2 ** 31:
+            return (2 ** 31 - 1 - (self.n_features - 1)) % self.n_features
+        return abs(h) % self.n_features
+
+    def add(self, texts: List[str]):
+        with self._lock:
+            for text in texts:
+                for term in self.analyzer(text):
+                    column = self._column(term)
+                    self._terms[column] = term
+                    self._terms.move_to_end(column)
+            while len(self._terms) > self.max_terms:
+                self._terms.popitem(last=False)
+
+    def get(self, column: int) -> Optional[str]:
+        return self._terms.get(column)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+class LazyModels(MutableMapping):
+    """按名称延迟加载模型：只有第一次访问某个模型时才从磁盘读取"""
 
-class SpamClassifier:
     def __init__(self):
-        self.tfidf = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
-        self.models = {}
+        self._loaded: Dict[str, Any] = {}
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._loaded.pop(name, None)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._loaded:
+            with self._lock:
+                if name not in self._loaded:
+                    if name not in self._loaders:
+                        raise KeyError(name)
+                    self._loaded[name] = self._loaders[name]()
+                    del self._loaders[name]
+        return self._loaded[name]
+
+    def __setitem__(self, name: str, model: Any):
+        self._loaders.pop(name, None)
+        self._loaded[name] = model
+
+    def __delitem__(self, name: str):
+        if name not in self._loaded and name not in self._loaders:
+            raise KeyError(name)
+        self._loaded.pop(name, None)
+        self._loaders.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._loaded or name in self._loaders
+
+    def __iter__(self) -> Iterator[str]:
+        # 先取快照，遍历 items() 时触发的加载不会改变正在迭代的字典
+        return iter(list(self._loaded) + [name for name in self._loaders if name not in self._loaded])
+
+    def __len__(self) -> int:
+        return len(self._loaded.keys() | self._loaders.keys())
+
+
+class BoosterClassifier:
+    """LightGBM 原生模型（lgb.Booster）的轻量包装，提供与 LGBMClassifier 相同的预测接口"""
+
+    def __init__(self, booster):
+        self.booster_ = booster
+        self.classes_ = np.array([0, 1])
+
+    def predict_proba(self, X) -> np.ndarray:
+        probabilities = self.booster_.predict(X)
+        return np.column_stack([1 - probabilities, probabilities])
+
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int32)
+
+
+class SpamClassifier:
+    def __init__(
+        self,
+        cache: Optional["PredictionCache"] = None,
+        fast_linear: bool = True,
+        tfidf_params: Optional[Dict[str, Any]] = None,
+        logreg_params: Optional[Dict[str, Any]] = None,
+        lgbm_params: Optional[Dict[str, Any]] = None,
+        feature_backend: str = "tfidf",
+    ):
+        if feature_backend not in FEATURE_BACKENDS:
+            raise ValueError(f"未知的特征后端: {feature_backend}（只支持 {', '.join(FEATURE_BACKENDS)}）")
+        self.feature_backend = feature_backend
+        self.tfidf_params = {**DEFAULT_TFIDF_PARAMS, **(tfidf_params or {})}
+        if "ngram_range" in self.tfidf_params:
+            # 从 JSON 读取的参数中 ngram_range 是列表
+            self.tfidf_params["ngram_range"] = tuple(self.tfidf_params["ngram_range"])
+        self.logreg_params = {**DEFAULT_LOGREG_PARAMS, **(logreg_params or {})}
+        self.lgbm_params = {**DEFAULT_LGBM_PARAMS, **(lgbm_params or {})}
+        # 未拟合的向量化器也延迟构造：只加载模型提供服务时无需为它导入 sklearn
+        self._tfidf, self._tfidf_loader = None, self.new_vectorizer
+        self._tfidf_lock = threading.Lock()
+        self.models = LazyModels()
         self.metrics = {}
+        self.thresholds: Dict[str, float] = {}
+        # 集成配置：{"model_names": [...], "weights": {...}, "stacking": {...}}，见 EnsemblePredictor
+        self.ensemble_config: Dict[str, Any] = {}
+        self.cache = cache
+        # 注册表中的模型版本（见 ModelRegistry.load），作为预测缓存键的一部分
+        self.version: Optional[str] = None
+        self.model_dir = MODEL_DIR
+        self.fast_linear = fast_linear
+        # Pipeline -> LinearScorer（不支持时为 None），模型被替换后对应条目随之失效
+        self._linear_scorers: "weakref.WeakKeyDictionary[Pipeline, Optional[LinearScorer]]" = weakref.WeakKeyDictionary()
+        self._feature_cache = {}
+        self._feature_names = (None, None)
+        self._term_index: Tuple[Any, Optional[HashedTermIndex]] = (None, None)
+
+    @property
+    def tfidf(self):
+        # 与 LazyModels 相同的双重检查：推理服务和 ModelHandle 可能在多个线程中同时第一次访问
+        if self._tfidf is None and self._tfidf_loader is not None:
+            with self._tfidf_lock:
+                if self._tfidf is None and self._tfidf_loader is not None:
+                    self._tfidf = self._tfidf_loader()
+                    self._tfidf_loader = None
+        return self._tfidf
+
+    @tfidf.setter
+    def tfidf(self, vectorizer):
+        with self._tfidf_lock:
+            self._tfidf = vectorizer
+            self._tfidf_loader = None
+
+    def _features(self, split: str, df: pl.DataFrame):
+        """返回 df 的 TF-IDF 稀疏矩阵：训练集只拟合一次向量化器，所有模型共享同一份矩阵"""
+        cached = self._feature_cache.get(split)
+        if cached is not None and cached[0] is df and cached[1] is self.tfidf:
+            return cached[2]
+
+        texts = df["cleaned_text"].to_list()
+        if split == "train":
+            X = self.tfidf.fit_transform(texts)
+            _drop_stop_words(self.tfidf)
+            self._feature_cache.clear()
+        else:
+            X = self.tfidf.transform(texts)
+        self._feature_cache[split] = (df, self.tfidf, X)
+        return X
+
+    def prepare_features(
+        self,
+        train_df: pl.DataFrame,
+        test_df: pl.DataFrame,
+        cache: Optional["FeatureCache"] = None,
+        data_key: Optional[str] = None,
+    ):
+        """构建训练/测试矩阵；提供 cache 和 data_key 时优先从磁盘缓存加载"""
+        key = None
+        if cache is not None and data_key is not None:
+            key = cache.features_key(data_key, self.tfidf.get_params())
+            cached = cache.load_features(key)
+            if cached is not None:
+                self.tfidf, X_train, X_test = cached
+                self._feature_cache = {
+                    "train": (train_df, self.tfidf, X_train),
+                    "test": (test_df, self.tfidf, X_test),
+                }
+                return X_train, X_test
 
-    def train_logistic_regression(self, train_df: pl.DataFrame) -> Pipeline:
-        X_train = train_df["cleaned_text"].to_list()
+        X_train = self._features("train", train_df)
+        X_test = self._features("test", test_df)
+        if key is not None:
+            cache.save_features(key, self.tfidf, X_train, X_test)
+        return X_train, X_test
+
+    def train_logistic_regression(self, train_df: pl.DataFrame) -> "Pipeline":
+        from sklearn.pipeline import Pipeline
+
+        X_train = self._features("train", train_df)
         y_train = train_df["label_encoded"].to_list()
-        
+
+        clf = self.new_logistic_regression()
+        clf.fit(X_train, y_train)
+
         pipeline = Pipeline([
             ("tfidf", self.tfidf),
-            ("clf", LogisticRegression(max_iter=1000, random_state=42, class_weight="balanced"))
+            ("clf", clf)
         ])
-        
-        pipeline.fit(X_train, y_train)
         self.models["logreg"] = pipeline
         return pipeline
 
-    def train_lightgbm(self, train_df: pl.DataFrame) -> lgb.LGBMClassifier:
-        X_train = self.tfidf.fit_transform(train_df["cleaned_text"].to_list())
+    def train_lightgbm(self, train_df: pl.DataFrame) -> "lgb.LGBMClassifier":
+        X_train = self._features("train", train_df)
         y_train = train_df["label_encoded"].to_list()
-        
-        model = lgb.LGBMClassifier(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=-1,
-            random_state=42,
-            class_weight="balanced",
-            verbose=-1
-        )
-        
+
+        model = self.new_lightgbm()
         model.fit(X_train, y_train)
         self.models["lightgbm"] = model
         return model
 
+    def new_vectorizer(self):
+        if self.feature_backend == "hashing":
+            return build_hashing_vectorizer(self.tfidf_params)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        return TfidfVectorizer(**self.tfidf_params)
+
+    def new_logistic_regression(self, **overrides):
+        from sklearn.linear_model import LogisticRegression
+
+        return LogisticRegression(**{**self.logreg_params, **overrides})
+
+    def new_lightgbm(self, **overrides) -> "lgb.LGBMClassifier":
+        import lightgbm as lgb
+
+        return lgb.LGBMClassifier(**{**self.lgbm_params, **overrides})
+
     def evaluate(self, model_name: str, test_df: pl.DataFrame) -> Dict[str, Any]:
         model = self.models[model_name]
-        X_test = test_df["cleaned_text"].to_list()
+        X_test = self._features("test", test_df)
         y_test = test_df["label_encoded"].to_list()
         
-        if model_name == "logreg":
-            X_test_tfidf = model.named_steps["tfidf"].transform(X_test)
-            y_pred = model.predict(X_test)
-            y_proba = model.predict_proba(X_test)[:, 1]
-        else:
-            X_test_tfidf = self.tfidf.transform(X_test)
-            y_pred = model.predict(X_test_tfidf)
-            y_proba = model.predict_proba(X_test_tfidf)[:, 1]
-        
-        metrics = {
+        if _is_pipeline(model):
+            model = model[-1]
+        y_proba = model.predict_proba(X_test)[:, 1]
+        y_pred = self.labels(model_name, y_proba)
+
+        metrics = self._compute_metrics(y_test, y_pred, y_proba)
+        metrics["threshold"] = self.threshold(model_name)
+        self.metrics[model_name] = metrics
+        return metrics
+
+    def threshold(self, model_name: str) -> float:
+        return self.thresholds.get(model_name, DEFAULT_THRESHOLD)
+
+    def set_threshold(self, model_name: str, threshold: float):
+        """调整模型的判定阈值，无需重新训练；调用 save_thresholds 或 save_models 后持久化"""
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"阈值必须在 [0, 1] 之间: {threshold}")
+        self.thresholds[model_name] = float(threshold)
+
+    def labels(self, model_name: str, probabilities: np.ndarray) -> np.ndarray:
+        return (np.asarray(probabilities) >= self.threshold(model_name)).astype(np.int32)
+
+    def is_spam(self, model_name: str, probability: float) -> bool:
+        return probability >= self.threshold(model_name)
+
+    @staticmethod
+    def _compute_metrics(y_test, y_pred, y_proba) -> Dict[str, Any]:
+        from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score, f1_score
+
+        return {
             "accuracy": accuracy_score(y_test, y_pred),
             "f1_score": f1_score(y_test, y_pred),
             "macro_f1": f1_score(y_test, y_pred, average="macro"),
@@ -72,35 +387,579 @@ class SpamClassifier:
             "classification_report": classification_report(y_test, y_pred, output_dict=True),
             "confusion_matrix": confusion_matrix(y_test, y_pred).tolist()
         }
-        
-        self.metrics[model_name] = metrics
-        return metrics
 
-    def predict(self, model_name: str, text: str) -> Tuple[int, float]:
+    def train_streaming(
+        self,
+        batches: Callable[[], Iterable[pl.DataFrame]],
+        n_features: int = 2 ** 18,
+        n_estimators: int = 100,
+        lgbm_max_rows: int = STREAMING_LGBM_MAX_ROWS,
+    ) -> Dict[str, Dict[str, Any]]:
+        """流式训练：batches 每次调用返回一个新的批次迭代器（见 iter_data_batches）
+
+        第一遍统计文档频率和标签分布；第二遍用 partial_fit 在全部训练行上训练线性模型，同时对训练行做蓄水池抽样，
+        结束后由样本构建一个 lgb.Dataset 一次性训练 LightGBM（逐批 init_model 续训时后面的树只见过各自的批次，
+        精度明显下降）；第三遍在测试行上评估。内存中最多只有一个批次加上 lgbm_max_rows 行稀疏特征，
+        训练行超过 lgbm_max_rows 时 LightGBM 只在均匀抽取的样本上训练。
+        """
+        import scipy.sparse as sp
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.pipeline import Pipeline
+
+        vectorizer = build_hashing_vectorizer({"n_features": n_features, "ngram_range": (1, 2)})
+        hasher = vectorizer[0]
+
+        doc_freq = np.zeros(n_features, dtype=np.int64)
+        label_counts = np.zeros(2, dtype=np.int64)
+        for batch in batches():
+            train_batch = batch.filter(~pl.col("is_test"))
+            if len(train_batch) == 0:
+                continue
+            X = hasher.transform(train_batch["cleaned_text"].to_list())
+            doc_freq += np.bincount(X.indices, minlength=n_features)
+            label_counts += np.bincount(train_batch["label_encoded"].to_numpy(), minlength=2)
+
+        n_docs = int(label_counts.sum())
+        idf = vectorizer[-1]
+        idf.idf_ = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+        idf.n_features_in_ = n_features
+        self.tfidf = vectorizer
+
+        class_weight = {label: n_docs / (2 * count) for label, count in enumerate(label_counts) if count}
+        linear = SGDClassifier(loss="log_loss", class_weight=class_weight, random_state=42)
+        rng = np.random.default_rng(42)
+        X_sample, y_sample, sample_keys = None, None, None
+        for batch in batches():
+            train_batch = batch.filter(~pl.col("is_test"))
+            if len(train_batch) == 0:
+                continue
+            X = self.tfidf.transform(train_batch["cleaned_text"].to_list()).tocsr()
+            y = train_batch["label_encoded"].to_numpy()
+            linear.partial_fit(X, y, classes=np.array([0, 1]))
+
+            # 每行一个随机键，始终保留键最小的 lgbm_max_rows 行，等价于在全部训练行上均匀无放回抽样
+            keys = rng.random(X.shape[0])
+            if X_sample is not None:
+                X, y, keys = sp.vstack([X_sample, X], format="csr"), np.concatenate([y_sample, y]), np.concatenate([sample_keys, keys])
+            if len(keys) > lgbm_max_rows:
+                keep = np.sort(np.argpartition(keys, lgbm_max_rows)[:lgbm_max_rows])
+                X, y, keys = X[keep], y[keep], keys[keep]
+            X_sample, y_sample, sample_keys = X, y, keys
+
+        # LGBMClassifier.fit 由样本矩阵构建一个 Dataset，所有树都在同一份数据上分裂
+        lgbm = self.new_lightgbm(n_estimators=n_estimators, class_weight=class_weight)
+        lgbm.fit(X_sample, y_sample)
+        del X_sample, y_sample, sample_keys
+
+        self.models["logreg"] = Pipeline([("tfidf", self.tfidf), ("clf", linear)])
+        self.models["lightgbm"] = lgbm
+
+        y_test, probabilities = [], {"logreg": [], "lightgbm": []}
+        for batch in batches():
+            test_batch = batch.filter(pl.col("is_test"))
+            if len(test_batch) == 0:
+                continue
+            X = self.tfidf.transform(test_batch["cleaned_text"].to_list())
+            y_test.append(test_batch["label_encoded"].to_numpy())
+            probabilities["logreg"].append(linear.predict_proba(X)[:, 1])
+            probabilities["lightgbm"].append(lgbm.predict_proba(X)[:, 1])
+
+        y_test = np.concatenate(y_test)
+        for model_name, chunks in probabilities.items():
+            y_proba = np.concatenate(chunks)
+            y_pred = self.labels(model_name, y_proba)
+            self.metrics[model_name] = self._compute_metrics(y_test, y_pred, y_proba)
+            self.metrics[model_name]["threshold"] = self.threshold(model_name)
+        return self.metrics
+
+    def update_incremental(
+        self,
+        feedback_df: pl.DataFrame,
+        train_df: pl.DataFrame,
+        lgbm_rounds: int = 20,
+        feedback_weight: float = 1.0,
+        lgbm_max_trees: Optional[int] = None,
+    ) -> List[str]:
+        """用新标注的反馈数据在现有模型上继续训练，返回更新过的模型名称
+
+        向量化器保持不变（tfidf 后端词表之外的新词会被忽略，hashing 后端新词同样会映射到特征列）。
+        反馈数据与完整训练集 train_df 合并后续训：Logistic Regression 从现有系数 warm start，
+        只需少量迭代即可收敛到“训练集 + 反馈”上的最优解；只在少量样本上 warm start 会收敛到只拟合这些样本的解，
+        遗忘原有分布。SGD 模型用 partial_fit 过一遍数据，LightGBM 以现有 booster 为 init_model 追加 lgbm_rounds 棵树；
+        追加后总树数会超过 lgbm_max_trees（默认为 n_estimators 的 2 倍）时改为在“训练集 + 反馈”上完整重训，
+        避免周期性更新让模型文件和单条打分延迟无限增长。
+        """
+        max_trees = lgbm_max_trees or 2 * self.lgbm_params["n_estimators"]
+        data = pl.concat([
+            feedback_df.select("cleaned_text", "label_encoded"),
+            train_df.select("cleaned_text", "label_encoded"),
+        ])
+        weights = [np.full(len(feedback_df), feedback_weight), np.ones(len(train_df))]
+        X = self.tfidf.transform(data["cleaned_text"].to_list())
+        y = data["label_encoded"].to_numpy()
+        sample_weight = np.concatenate(weights)
+
+        from sklearn.pipeline import Pipeline
+
+        updated = []
+        for name in list(self.models):
+            model = self.models[name]
+            if _is_pipeline(model) and self._is_linear(model[-1]):
+                clf = model[-1]
+                if hasattr(clf, "partial_fit"):
+                    clf = copy.deepcopy(clf)
+                    clf.partial_fit(X, y, sample_weight=sample_weight)
+                else:
+                    previous = clf
+                    clf = self.new_logistic_regression(warm_start=True)
+                    clf.coef_ = previous.coef_.copy()
+                    clf.intercept_ = previous.intercept_.copy()
+                    clf.fit(X, y, sample_weight=sample_weight)
+                # 换成新的 Pipeline 对象，对应的快速打分器随之重建
+                self.models[name] = Pipeline([("tfidf", self.tfidf), ("clf", clf)])
+            elif hasattr(model, "booster_"):
+                n_trees = model.booster_.current_iteration()
+                if n_trees + lgbm_rounds > max_trees:
+                    print(f"   {name}: 已有 {n_trees} 棵树，追加后超过上限 {max_trees}，改为完整重训")
+                    lgbm = self.new_lightgbm()
+                    lgbm.fit(X, y, sample_weight=sample_weight)
+                else:
+                    lgbm = self.new_lightgbm(n_estimators=lgbm_rounds)
+                    lgbm.fit(X, y, sample_weight=sample_weight, init_model=model.booster_)
+                self.models[name] = lgbm
+            else:
+                print(f"   跳过不支持增量更新的模型: {name}")
+                continue
+            updated.append(name)
+        return updated
+
+    def predict(self, model_name: str, text: str, use_cache: bool = True) -> Tuple[int, float]:
+        labels, probabilities = self.predict_batch(model_name, [text], use_cache)
+        return int(labels[0]), float(probabilities[0])
+
+    def predict_batch(self, model_name: str, texts: List[str], use_cache: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """use_cache=False 时既不读也不写预测缓存"""
         model = self.models[model_name]
-        
-        if model_name == "logreg":
-            from src.data_processing import clean_text
-            cleaned_text = clean_text(text)
-            prediction = model.predict([cleaned_text])[0]
-            probability = model.predict_proba([cleaned_text])[0, 1]
+        cache = self.cache if use_cache else None
+        with telemetry.stage_timer("cleaning"):
+            cleaned_texts = clean_text_batch(texts)
+        probabilities = np.empty(len(cleaned_texts), dtype=np.float64)
+
+        # 清洗后相同的文本只查询和计算一次，并优先使用预测缓存
+        positions: Dict[str, List[int]] = {}
+        for i, cleaned_text in enumerate(cleaned_texts):
+            positions.setdefault(cleaned_text, []).append(i)
+        pending = []
+        for cleaned_text, cached in zip(positions, self._lookup_cache(cache, model_name, list(positions))):
+            if cached is not None:
+                probabilities[positions[cleaned_text]] = cached
+            else:
+                pending.append(cleaned_text)
+
+        if pending:
+            try:
+                unique_probabilities = self._predict_proba(model, pending)
+            except Exception:
+                telemetry.count_error("scoring")
+                raise
+            telemetry.get_metrics().inc(telemetry.PREDICTIONS, len(pending), model=model_name)
+            for cleaned_text, probability in zip(pending, unique_probabilities):
+                probabilities[positions[cleaned_text]] = probability
+                if cache is not None:
+                    cache.set_probability(model_name, cleaned_text, probability, self.version)
+
+        return self.labels(model_name, probabilities), probabilities
+
+    def _lookup_cache(self, cache: Optional["PredictionCache"], model_name: str, cleaned_texts: List[str]) -> List[Optional[float]]:
+        """批量查询预测缓存；预测缓存的命中和未命中次数只在这里统计"""
+        if cache is None:
+            return [None] * len(cleaned_texts)
+        cached = [cache.get_probability(model_name, cleaned_text, self.version) for cleaned_text in cleaned_texts]
+        n_misses = cached.count(None)
+        telemetry.count_cache("prediction", len(cached) - n_misses, n_misses)
+        return cached
+
+    def warm_up(self, texts: List[str]):
+        """对每个模型打一次分，触发延迟加载和快速打分器的构建；不经过预测缓存，也不计入预测条数和缓存命中率"""
+        cleaned_texts = clean_text_batch(texts)
+        for name in list(self.models):
+            self._predict_proba(self.models[name], cleaned_texts)
+
+    def predict_models(self, model_names: List[str], text: str, use_cache: bool = True) -> Dict[str, float]:
+        """同一条短信在多个模型上的概率；共享向量化器的模型只做一次清洗和向量化"""
+        if len(model_names) == 1:
+            return {model_names[0]: self.predict(model_names[0], text, use_cache)[1]}
+        per_model, _ = self.ensemble(model_names).predict_proba([text], use_cache)
+        return {name: float(probabilities[0]) for name, probabilities in per_model.items()}
+
+    def ensemble(self, model_names: Optional[List[str]] = None) -> "EnsemblePredictor":
+        config = self.ensemble_config
+        names = list(model_names or config.get("model_names") or self.models)
+        # 堆叠模型只对训练时的模型组合有效，其他组合回退为加权平均
+        stacking = config.get("stacking") if names == config.get("model_names") else None
+        return EnsemblePredictor(self, names, weights=config.get("weights"), stacking=stacking)
+
+    def _predict_proba(self, model, cleaned_texts: List[str]) -> np.ndarray:
+        if _is_pipeline(model):
+            scorer = self._linear_scorer(model)
+            if scorer is not None:
+                # 编译后的打分器把向量化和打分合并为一次遍历
+                with telemetry.stage_timer("scoring"):
+                    return scorer.predict_proba(cleaned_texts)
+            with telemetry.stage_timer("vectorization"):
+                X = model[:-1].transform(cleaned_texts)
+            model = model[-1]
         else:
-            from src.data_processing import clean_text
-            cleaned_text = clean_text(text)
-            text_tfidf = self.tfidf.transform([cleaned_text])
-            prediction = model.predict(text_tfidf)[0]
-            probability = model.predict_proba(text_tfidf)[0, 1]
-        
-        return prediction, probability
-
-    def save_models(self):
-        joblib.dump(self.models["logreg"], MODEL_DIR / "logreg_model.joblib")
-        joblib.dump(self.models["lightgbm"], MODEL_DIR / "lightgbm_model.joblib")
-        joblib.dump(self.tfidf, MODEL_DIR / "tfidf_vectorizer.joblib")
-        joblib.dump(self.metrics, MODEL_DIR / "metrics.joblib")
-
-    def load_models(self):
-        self.models["logreg"] = joblib.load(MODEL_DIR / "logreg_model.joblib")
-        self.models["lightgbm"] = joblib.load(MODEL_DIR / "lightgbm_model.joblib")
-        self.tfidf = joblib.load(MODEL_DIR / "tfidf_vectorizer.joblib")
-        self.metrics = joblib.load(MODEL_DIR / "metrics.joblib")
+            with telemetry.stage_timer("vectorization"):
+                X = self.tfidf.transform(cleaned_texts)
+        with telemetry.stage_timer("scoring"):
+            return model.predict_proba(X)[:, 1]
+
+    def _linear_scorer(self, pipeline: "Pipeline") -> Optional[LinearScorer]:
+        if not self.fast_linear:
+            return None
+        if pipeline not in self._linear_scorers:
+            self._linear_scorers[pipeline] = LinearScorer.from_pipeline(pipeline)
+        return self._linear_scorers[pipeline]
+
+    def explain(self, model_name: str, text: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """本地解释：返回短信中对预测影响最大的 n-gram 及其贡献（对数几率空间，正值偏向垃圾短信）
+
+        Logistic Regression 使用 系数 × tfidf 值，LightGBM 使用 pred_contrib 输出的 SHAP 值。
+        """
+        return self.explain_batch(model_name, [text], top_k)[0]
+
+    def explain_batch(self, model_name: str, texts: List[str], top_k: int = 5) -> List[List[Tuple[str, float]]]:
+        """explain 的批量版本：线性模型直接查快速打分器的系数表，LightGBM 每 EXPLAIN_CHUNK_SIZE 行调用一次 pred_contrib"""
+        model = self.models[model_name]
+        cleaned_texts = clean_text_batch(texts)
+
+        scorer = self._linear_scorer(model) if _is_pipeline(model) else None
+        if scorer is not None:
+            return [self._top_terms(scorer.contributions(text).items(), top_k) for text in cleaned_texts]
+
+        rows = []
+        if _is_pipeline(model):
+            vectorizer = model[0]
+            X = model[:-1].transform(cleaned_texts).tocsr()
+            coef = model[-1].coef_[0]
+            for i in range(X.shape[0]):
+                indices = X[i].indices
+                rows.append((indices, X[i].data * coef[indices]))
+        else:
+            vectorizer = self.tfidf
+            X = self.tfidf.transform(cleaned_texts).tocsr()
+            booster = getattr(model, "booster_", model)
+            for start in range(0, X.shape[0], EXPLAIN_CHUNK_SIZE):
+                X_chunk = X[start:start + EXPLAIN_CHUNK_SIZE]
+                shap_values = booster.predict(X_chunk, pred_contrib=True)
+                shap_values = shap_values.toarray() if hasattr(shap_values, "toarray") else np.asarray(shap_values)
+                # 只保留短信中实际出现的 n-gram，最后一列是偏置项
+                for i in range(X_chunk.shape[0]):
+                    indices = X_chunk[i].indices
+                    rows.append((indices, shap_values[i, indices]))
+
+        names = self._get_feature_names(vectorizer)
+        # hashing 后端没有词表，通过最近见过的 n-gram 反查特征列
+        term_index = self._get_term_index(vectorizer) if names is None else None
+        if term_index is not None:
+            term_index.add(cleaned_texts)
+
+        def term(index: int) -> str:
+            if names is not None:
+                return str(names[index])
+            return (term_index.get(index) if term_index is not None else None) or f"feature_{index}"
+
+        return [
+            self._top_terms(((term(index), contribution) for index, contribution in zip(indices, contributions)), top_k)
+            for indices, contributions in rows
+        ]
+
+    @staticmethod
+    def _top_terms(contributions: Iterable[Tuple[str, float]], top_k: int) -> List[Tuple[str, float]]:
+        nonzero = [(term, float(contribution)) for term, contribution in contributions if contribution != 0]
+        return sorted(nonzero, key=lambda item: -abs(item[1]))[:top_k]
+
+    def _get_feature_names(self, vectorizer) -> Optional[np.ndarray]:
+        if self._feature_names[0] is not vectorizer:
+            names = vectorizer.get_feature_names_out() if hasattr(vectorizer, "vocabulary_") else None
+            self._feature_names = (vectorizer, names)
+        return self._feature_names[1]
+
+    def _get_term_index(self, vectorizer) -> Optional[HashedTermIndex]:
+        if not is_hashing_vectorizer(vectorizer) or TERM_INDEX_SIZE <= 0:
+            return None
+        if self._term_index[0] is not vectorizer:
+            self._term_index = (vectorizer, HashedTermIndex(vectorizer[0]))
+        return self._term_index[1]
+
+    def save_models(self, compact: bool = True, model_dir: Optional[Path] = None):
+        """保存模型；compact=True 时尽量使用紧凑格式（npz / LightGBM 原生文本），否则回退到 joblib
+
+        model_dir 默认为最近一次 load_models 的目录（初始为 models/），模型注册表用它写入版本目录。
+        """
+        model_dir = Path(model_dir) if model_dir is not None else self.model_dir
+        model_dir.mkdir(parents=True, exist_ok=True)
+        vectorizer_compact = compact and self._save_vectorizer_compact(model_dir / VECTORIZER_COMPACT_FILE)
+        if not vectorizer_compact:
+            _drop_stop_words(self.tfidf)
+            joblib.dump(self.tfidf, model_dir / "tfidf_vectorizer.joblib")
+            (model_dir / VECTORIZER_COMPACT_FILE).unlink(missing_ok=True)
+
+        for name, model in self.models.items():
+            compact_path = None
+            if compact and _is_pipeline(model):
+                if vectorizer_compact and model[0] is self.tfidf and self._is_linear(model[-1]):
+                    compact_path = model_dir / LINEAR_COMPACT_FILE.format(name=name)
+                    clf = model[-1]
+                    # hashing 后端的系数向量长度为 n_features，训练中未出现的列系数全为 0，压缩后只占很小的空间
+                    np.savez_compressed(compact_path, coef=clf.coef_, intercept=clf.intercept_, classes=clf.classes_)
+            elif compact and hasattr(model, "booster_"):
+                compact_path = model_dir / LIGHTGBM_NATIVE_FILE.format(name=name)
+                # 文本格式中 feature_names / feature_infos 每列各占一项，hashing 后端有 2^18 列，gzip 后体积缩小一个数量级
+                with gzip.open(compact_path, "wt", encoding="utf-8") as f:
+                    f.write(model.booster_.model_to_string())
+
+            # 删除另一种格式的旧文件，避免加载时读到过期的模型
+            for stale in self._artifact_paths(name, model_dir):
+                if stale != compact_path:
+                    stale.unlink(missing_ok=True)
+            if compact_path is None:
+                joblib.dump(model, model_dir / JOBLIB_MODEL_FILE.format(name=name))
+
+        joblib.dump(self.metrics, model_dir / "metrics.joblib")
+        self.save_thresholds(model_dir)
+        if self.ensemble_config:
+            with open(model_dir / ENSEMBLE_FILE, "w", encoding="utf-8") as f:
+                json.dump(self.ensemble_config, f, indent=2)
+
+    def save_thresholds(self, model_dir: Optional[Path] = None):
+        """只写出判定阈值，调整工作点后无需重新保存模型"""
+        model_dir = Path(model_dir) if model_dir is not None else self.model_dir
+        with open(model_dir / THRESHOLDS_FILE, "w", encoding="utf-8") as f:
+            json.dump(self.thresholds, f, indent=2)
+
+    def load_models(self, model_dir: Optional[Path] = None):
+        """只登记各模型的加载函数，真正的反序列化推迟到第一次使用该模型时"""
+        model_dir = self.model_dir = Path(model_dir) if model_dir is not None else MODEL_DIR
+        self.models = LazyModels()
+        for name in self._discover_model_names(model_dir):
+            self.models.register(name, lambda name=name: self._load_model(name, model_dir))
+
+        if (model_dir / VECTORIZER_COMPACT_FILE).exists():
+            loader = functools.partial(self._load_vectorizer_compact, model_dir / VECTORIZER_COMPACT_FILE)
+        else:
+            loader = functools.partial(joblib.load, model_dir / "tfidf_vectorizer.joblib")
+        with self._tfidf_lock:
+            self._tfidf, self._tfidf_loader = None, loader
+
+        metrics_path = model_dir / "metrics.joblib"
+        self.metrics = joblib.load(metrics_path) if metrics_path.exists() else {}
+        thresholds_path = model_dir / THRESHOLDS_FILE
+        if thresholds_path.exists():
+            with open(thresholds_path, "r", encoding="utf-8") as f:
+                self.thresholds = json.load(f)
+        else:
+            self.thresholds = {}
+        ensemble_path = model_dir / ENSEMBLE_FILE
+        if ensemble_path.exists():
+            with open(ensemble_path, "r", encoding="utf-8") as f:
+                self.ensemble_config = json.load(f)
+        else:
+            self.ensemble_config = {}
+        self._feature_cache.clear()
+
+    @staticmethod
+    def _artifact_paths(name: str, model_dir: Path = MODEL_DIR) -> List[Path]:
+        return [
+            model_dir / LINEAR_COMPACT_FILE.format(name=name),
+            model_dir / LIGHTGBM_NATIVE_FILE.format(name=name),
+            model_dir / JOBLIB_MODEL_FILE.format(name=name),
+        ]
+
+    @staticmethod
+    def _discover_model_names(model_dir: Path = MODEL_DIR) -> List[str]:
+        names = []
+        for pattern in (LINEAR_COMPACT_FILE, LIGHTGBM_NATIVE_FILE, JOBLIB_MODEL_FILE):
+            prefix, suffix = pattern.split("{name}")
+            for path in sorted(model_dir.glob(f"{prefix}*{suffix}")):
+                name = path.name[len(prefix):len(path.name) - len(suffix)]
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def _load_model(self, name: str, model_dir: Path = MODEL_DIR):
+        linear_path = model_dir / LINEAR_COMPACT_FILE.format(name=name)
+        native_path = model_dir / LIGHTGBM_NATIVE_FILE.format(name=name)
+
+        if linear_path.exists():
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.pipeline import Pipeline
+
+            with np.load(linear_path) as data:
+                clf = LogisticRegression()
+                clf.coef_ = data["coef"]
+                clf.intercept_ = data["intercept"]
+                clf.classes_ = data["classes"]
+                clf.n_features_in_ = clf.coef_.shape[1]
+            return Pipeline([("tfidf", self.tfidf), ("clf", clf)])
+
+        if native_path.exists():
+            import lightgbm as lgb
+
+            with gzip.open(native_path, "rt", encoding="utf-8") as f:
+                return BoosterClassifier(lgb.Booster(model_str=f.read()))
+
+        return joblib.load(model_dir / JOBLIB_MODEL_FILE.format(name=name))
+
+    @staticmethod
+    def _is_linear(clf) -> bool:
+        # SGDClassifier(loss="log_loss") 与 LogisticRegression 的二分类概率公式相同，可以共用紧凑格式
+        return hasattr(clf, "coef_") and getattr(clf, "loss", "log_loss") == "log_loss"
+
+    def _save_vectorizer_compact(self, path: Path) -> bool:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = self.tfidf
+        if is_hashing_vectorizer(vectorizer) and vectorizer[-1].use_idf and not callable(vectorizer[0].analyzer):
+            # 只保存参数和长度为 n_features 的 idf 向量，文件大小与词表规模无关
+            hasher, transformer = vectorizer[0], vectorizer[-1]
+            params = {key: hasher.get_params()[key] for key in _HASHING_PARAMS}
+            params.update({key: transformer.get_params()[key] for key in _IDF_PARAMS})
+            params["backend"] = "hashing"
+            np.savez_compressed(path, idf=transformer.idf_, params=np.array(json.dumps(params)))
+            return True
+        if type(vectorizer) is not TfidfVectorizer or not vectorizer.use_idf:
+            return False
+
+        terms = [""] * len(vectorizer.vocabulary_)
+        for term, index in vectorizer.vocabulary_.items():
+            terms[index] = term
+        if any("\n" in term for term in terms):
+            return False
+
+        # 词表按列顺序以换行拼接成一段 UTF-8 字节；定长 unicode 数组按最长的 n-gram 分配空间，反而比 joblib 更大
+        params = {key: vectorizer.get_params()[key] for key in _COMPACT_VECTORIZER_PARAMS}
+        vocab = np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8)
+        np.savez_compressed(path, vocab=vocab, idf=vectorizer.idf_, params=np.array(json.dumps(params)))
+        return True
+
+    @staticmethod
+    def _load_vectorizer_compact(path: Path):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            params["ngram_range"] = tuple(params["ngram_range"])
+            if params.pop("backend", "tfidf") == "hashing":
+                vectorizer = build_hashing_vectorizer(params)
+                vectorizer[-1].idf_ = data["idf"]
+                vectorizer[-1].n_features_in_ = params["n_features"]
+                return vectorizer
+            terms = data["vocab"].tobytes().decode("utf-8").split("\n")
+            vocabulary = {term: index for index, term in enumerate(terms)}
+            vectorizer = TfidfVectorizer(vocabulary=vocabulary, **params)
+            vectorizer.idf_ = data["idf"]
+        return vectorizer
+
+
+class EnsemblePredictor:
+    """多模型集成打分：每个向量化器只对文本变换一次，同一个稀疏矩阵依次交给使用它的所有模型
+
+    综合分数默认是各模型概率的加权平均；调用 fit_stacking 后改为在各模型对数几率上做 Logistic Regression 堆叠。
+    """
+
+    def __init__(
+        self,
+        classifier: SpamClassifier,
+        model_names: List[str],
+        weights: Optional[Dict[str, float]] = None,
+        stacking: Optional[Dict[str, Any]] = None,
+    ):
+        self.classifier = classifier
+        self.model_names = list(model_names)
+        self.weights = {name: float((weights or {}).get(name, 1.0)) for name in self.model_names}
+        self.stacking = stacking
+
+    def _groups(self) -> List[Tuple[Any, List[Tuple[str, Any]]]]:
+        """按向量化器分组：[(vectorizer, [(model_name, estimator), ...]), ...]"""
+        groups: Dict[int, Tuple[Any, List[Tuple[str, Any]]]] = {}
+        for name in self.model_names:
+            model = self.classifier.models[name]
+            if _is_pipeline(model):
+                vectorizer = model[0] if len(model) == 2 else model[:-1]
+                estimator = model[-1]
+            else:
+                vectorizer, estimator = self.classifier.tfidf, model
+            groups.setdefault(id(vectorizer), (vectorizer, []))[1].append((name, estimator))
+        return list(groups.values())
+
+    def predict_proba(self, texts: List[str], use_cache: bool = True) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """返回 (各模型概率, 综合概率)；use_cache=False 时不读写预测缓存"""
+        cache = self.classifier.cache if use_cache else None
+        with telemetry.stage_timer("cleaning"):
+            cleaned_texts = clean_text_batch(texts)
+        unique_texts = list(dict.fromkeys(cleaned_texts))
+        positions = {text: i for i, text in enumerate(unique_texts)}
+
+        per_model = {
+            name: np.array(
+                [np.nan if cached is None else cached for cached in self.classifier._lookup_cache(cache, name, unique_texts)],
+                dtype=np.float64,
+            )
+            for name in self.model_names
+        }
+
+        for vectorizer, members in self._groups():
+            # 只对至少有一个模型未命中缓存的文本做向量化
+            needed = np.flatnonzero(np.any([np.isnan(per_model[name]) for name, _ in members], axis=0))
+            if len(needed) == 0:
+                continue
+            with telemetry.stage_timer("vectorization"):
+                X = vectorizer.transform([unique_texts[i] for i in needed])
+            for name, estimator in members:
+                missing = np.isnan(per_model[name][needed])
+                rows = needed[missing]
+                with telemetry.stage_timer("scoring"):
+                    probabilities = estimator.predict_proba(X[missing])[:, 1]
+                per_model[name][rows] = probabilities
+                telemetry.get_metrics().inc(telemetry.PREDICTIONS, len(rows), model=name)
+                if cache is not None:
+                    for i, probability in zip(rows, probabilities):
+                        cache.set_probability(name, unique_texts[i], probability, self.classifier.version)
+
+        index = np.fromiter((positions[text] for text in cleaned_texts), dtype=np.int64, count=len(cleaned_texts))
+        per_model = {name: probabilities[index] for name, probabilities in per_model.items()}
+        return per_model, self.combine(per_model)
+
+    def predict(self, text: str) -> Tuple[Dict[str, float], float]:
+        per_model, combined = self.predict_proba([text])
+        return {name: float(probabilities[0]) for name, probabilities in per_model.items()}, float(combined[0])
+
+    def combine(self, per_model: Dict[str, np.ndarray]) -> np.ndarray:
+        if self.stacking is not None:
+            z = self.stacking["intercept"] + sum(
+                coef * self._logit(per_model[name]) for name, coef in zip(self.model_names, self.stacking["coef"])
+            )
+            return 1 / (1 + np.exp(-z))
+        total = sum(self.weights.values())
+        return sum(self.weights[name] * np.asarray(per_model[name]) for name in self.model_names) / total
+
+    def fit_stacking(self, df: pl.DataFrame) -> Dict[str, Any]:
+        """在留出集（需要 cleaned_text 和 label_encoded 列）上拟合堆叠模型，并写入分类器的集成配置"""
+        from sklearn.linear_model import LogisticRegression
+
+        per_model, _ = self.predict_proba(df["cleaned_text"].to_list())
+        X = np.column_stack([self._logit(per_model[name]) for name in self.model_names])
+        meta = LogisticRegression().fit(X, df["label_encoded"].to_numpy())
+        self.stacking = {"coef": meta.coef_[0].tolist(), "intercept": float(meta.intercept_[0])}
+        self.classifier.ensemble_config = self.config()
+        return self.stacking
+
+    def config(self) -> Dict[str, Any]:
+        return {"model_names": self.model_names, "weights": self.weights, "stacking": self.stacking}
+
+    @staticmethod
+    def _logit(probabilities: np.ndarray) -> np.ndarray:
+        probabilities = np.clip(np.asarray(probabilities, dtype=np.float64), 1e-6, 1 - 1e-6)
+        return np.log(probabilities / (1 - probabilities))
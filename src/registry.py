@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.models import MODEL_DIR, VECTORIZER_COMPACT_FILE, SpamClassifier
+
+REGISTRY_DIR = MODEL_DIR / "registry"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+# 热切换前用于预热新版本的样例短信：触发模型的延迟加载和快速打分器的构建
+WARMUP_TEXTS = [
+    "Free entry in 2 a wkly comp to win FA Cup final tkts",
+    "Ok lar... Joking wif u oni...",
+    "URGENT! You have won a 1 week FREE membership",
+]
+
+
+def _digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """版本化的模型注册表
+
+    每个版本是 versions/<version>/ 下的一组模型文件加 manifest.json（指标、文件哈希、创建时间等），
+    CURRENT 文件记录当前生效的版本；发布和切换都通过 os.replace 原子完成，读取方不会看到半写入的状态。
+    """
+
+    def __init__(self, root: Path = REGISTRY_DIR):
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+
+    def version_dir(self, version: str) -> Path:
+        return self.versions_dir / version
+
+    def current_version(self) -> Optional[str]:
+        try:
+            version = (self.root / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def set_current(self, version: str):
+        if not (self.version_dir(version) / MANIFEST_FILE).exists():
+            raise ValueError(f"模型版本不存在: {version}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".current-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, self.root / CURRENT_FILE)
+
+    def publish(
+        self,
+        classifier: SpamClassifier,
+        activate: bool = True,
+        note: Optional[str] = None,
+        keep: Optional[int] = 5,
+    ) -> str:
+        """把分类器保存为一个新版本；activate=True 时同时设为当前版本，keep 为保留的历史版本数"""
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix=".staging-"))
+        try:
+            classifier.save_models(model_dir=staging)
+            files = {path.name: _digest(path) for path in sorted(staging.iterdir()) if path.is_file()}
+            vectorizer_file = VECTORIZER_COMPACT_FILE if VECTORIZER_COMPACT_FILE in files else "tfidf_vectorizer.joblib"
+            created_at = datetime.now()
+            version = f"{created_at:%Y%m%d-%H%M%S}-{hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:8]}"
+
+            manifest = {
+                "version": version,
+                "created_at": created_at.isoformat(timespec="seconds"),
+                "parent": self.current_version(),
+                "note": note,
+                "models": list(classifier.models),
+                "metrics": classifier.metrics,
+                "thresholds": classifier.thresholds,
+                "vectorizer_hash": files.get(vectorizer_file),
+                "files": files,
+            }
+            with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False, default=float)
+            if self.version_dir(version).exists():
+                # 同一秒内重复发布完全相同的文件
+                shutil.rmtree(staging)
+            else:
+                os.replace(staging, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.set_current(version)
+        if keep is not None:
+            self.prune(keep)
+        return version
+
+    def manifest(self, version: str) -> Dict[str, Any]:
+        with open(self.version_dir(version) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        manifests = [
+            self.manifest(path.name) for path in self.versions_dir.iterdir() if (path / MANIFEST_FILE).exists()
+        ]
+        return sorted(manifests, key=lambda manifest: manifest["created_at"])
+
+    def load(self, version: Optional[str] = None, cache=None, **kwargs) -> SpamClassifier:
+        version = version or self.current_version()
+        if version is None:
+            raise ValueError("注册表中还没有已发布的模型版本")
+        classifier = SpamClassifier(cache=cache, **kwargs)
+        classifier.load_models(self.version_dir(version))
+        classifier.version = version
+        return classifier
+
+    def rollback(self) -> str:
+        """切回当前版本的上一个版本"""
+        current = self.current_version()
+        parent = self.manifest(current).get("parent") if current else None
+        if parent is None:
+            raise ValueError("当前版本没有可回滚的上一个版本")
+        self.set_current(parent)
+        return parent
+
+    def prune(self, keep: int = 5):
+        """只保留最新的 keep 个版本；当前版本和比它更新、尚未切换的版本（可能在等待人工 activate）始终保留"""
+        current = self.current_version()
+        if current is None:
+            return
+        current_created_at = self.manifest(current)["created_at"]
+        for manifest in self.list_versions()[:-keep] if keep > 0 else self.list_versions():
+            if manifest["version"] != current and manifest["created_at"] < current_created_at:
+                shutil.rmtree(self.version_dir(manifest["version"]), ignore_errors=True)
+
+
+def load_current(cache=None, **kwargs) -> SpamClassifier:
+    """加载注册表的当前版本（受 activate / rollback 控制）；注册表为空时加载 models/ 下的文件"""
+    registry = ModelRegistry()
+    if registry.current_version() is not None:
+        return registry.load(cache=cache, **kwargs)
+    classifier = SpamClassifier(cache=cache, **kwargs)
+    classifier.load_models()
+    return classifier
+
+
+class ModelHandle:
+    """持有当前生效的 SpamClassifier，并在注册表切换版本时热替换
+
+    新版本先在后台加载并预热，完成后才替换引用，期间旧版本继续提供服务；
+    属性访问会转发给当前的分类器，因此可以直接替代 SpamClassifier 传给 SpamAgent 或推理服务。
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        cache=None,
+        poll_interval: Optional[float] = 10.0,
+        warmup_texts: Optional[List[str]] = None,
+    ):
+        self.registry = registry
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.warmup_texts = warmup_texts if warmup_texts is not None else WARMUP_TEXTS
+        self.version: Optional[str] = None
+        self._classifier: Optional[SpamClassifier] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh()
+
+    @property
+    def classifier(self) -> SpamClassifier:
+        return self._classifier
+
+    def __getattr__(self, name: str):
+        # 只有实例上找不到的属性才会走到这里
+        classifier = self.__dict__.get("_classifier")
+        if classifier is None:
+            raise AttributeError(name)
+        return getattr(classifier, name)
+
+    def refresh(self) -> bool:
+        """注册表的当前版本变化时加载并切换到新版本，返回是否发生了切换"""
+        with self._lock:
+            version = self.registry.current_version()
+            if version is None or version == self.version:
+                return False
+
+            classifier = self.registry.load(version, cache=self.cache)
+            classifier.warm_up(self.warmup_texts)
+
+            # 预测缓存的键包含版本号，旧版本的条目不会被新版本读到，无需清空共享缓存；
+            # 先替换分类器再更新版本号，读到新版本号的调用方一定使用新的分类器
+            self._classifier = classifier
+            self.version = version
+            print(f"   已切换到模型版本 {version}")
+            return True
+
+    def start(self):
+        if self.poll_interval is None or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, name="model-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"   模型热更新失败，继续使用版本 {self.version}: {e}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="模型注册表管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="列出所有版本")
+    activate_parser = subparsers.add_parser("activate", help="切换当前版本")
+    activate_parser.add_argument("version", type=str, help="要切换到的版本")
+    subparsers.add_parser("rollback", help="回滚到上一个版本")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == "list":
+        current = registry.current_version()
+        for manifest in registry.list_versions():
+            marker = "*" if manifest["version"] == current else " "
+            macro_f1 = {name: f"{metrics.get('macro_f1', 0):.4f}" for name, metrics in manifest["metrics"].items()}
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  models={manifest['models']}  macro_f1={macro_f1}")
+    elif args.command == "activate":
+        registry.set_current(args.version)
+        print(f"当前版本: {args.version}")
+    else:
+        print(f"已回滚到版本: {registry.rollback()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import json
+import os
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src import telemetry
+from src.cache import PredictionCache
+from src.models import SpamClassifier
+from src.registry import WARMUP_TEXTS, ModelHandle, ModelRegistry
+
+if TYPE_CHECKING:
+    from src.feedback import FeedbackStore
+
+MAX_BATCH_SIZE = int(os.getenv("SPAM_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("SPAM_MAX_WAIT_MS", "5"))
+DEFAULT_MODEL = "lightgbm"
+METRICS_ENABLED = os.getenv("SPAM_METRICS", "1") != "0"
+RELOAD_INTERVAL = float(os.getenv("SPAM_RELOAD_INTERVAL", "10"))
+
+
+class MicroBatcher:
+    """把并发请求在一个很短的时间窗口内合并成批次，每批只做一次向量化预测"""
+
+    def __init__(self, classifier: SpamClassifier, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def predict(self, model_name: str, text: str) -> Tuple[int, float]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((model_name, text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            groups = defaultdict(list)
+            for model_name, text, future in batch:
+                groups[model_name].append((text, future))
+
+            for model_name, items in groups.items():
+                texts = [text for text, _ in items]
+                telemetry.get_metrics().observe(telemetry.BATCH_SIZE, len(texts), model=model_name)
+                try:
+                    labels, probabilities = await loop.run_in_executor(
+                        None, self.classifier.predict_batch, model_name, texts
+                    )
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), label, probability in zip(items, labels, probabilities):
+                    if not future.done():
+                        future.set_result((int(label), float(probability)))
+
+
+class SpamServer:
+    """无框架依赖的 ASGI 应用，可用 uvicorn 等任意 ASGI 服务器运行
+
+    - POST /predict  {"text": "..."} 或 {"texts": [...]}，可选 "model"
+    - GET  /healthz  进程存活检查
+    - GET  /readyz   模型加载完成后返回 200
+    - GET  /metrics  Prometheus 文本格式的指标（SPAM_METRICS=0 时关闭）
+    - POST /reload   立即检查模型注册表并热切换到当前版本（默认每 SPAM_RELOAD_INTERVAL 秒自动检查）
+    - POST /feedback {"text": "...", "label": "spam"} 或 {"texts": [...], "labels": [...]}，写入反馈存储
+    """
+
+    def __init__(self, classifier: Optional[SpamClassifier] = None,
+                 max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                 metrics_enabled: bool = METRICS_ENABLED):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.metrics_enabled = metrics_enabled
+        self.metrics: Optional[telemetry.InMemoryMetrics] = None
+        self.batcher: Optional[MicroBatcher] = None
+        self.feedback_store: Optional["FeedbackStore"] = None
+        self.ready = False
+
+    async def startup(self):
+        if self.metrics_enabled:
+            current = telemetry.get_metrics()
+            if isinstance(current, telemetry.InMemoryMetrics):
+                self.metrics = current
+            else:
+                self.metrics = telemetry.InMemoryMetrics()
+                telemetry.set_metrics(self.metrics)
+        if self.classifier is None:
+            self.classifier = await asyncio.to_thread(self._load_classifier)
+        self.batcher = MicroBatcher(self.classifier, self.max_batch_size, self.max_wait_ms)
+        await self.batcher.start()
+        self.ready = True
+
+    async def shutdown(self):
+        self.ready = False
+        if self.batcher is not None:
+            await self.batcher.stop()
+        if isinstance(self.classifier, ModelHandle):
+            await asyncio.to_thread(self.classifier.stop)
+
+    @staticmethod
+    def _load_classifier():
+        cache = PredictionCache(path=os.getenv("SPAM_PREDICTION_CACHE_PATH"))
+        registry = ModelRegistry()
+        if registry.current_version() is not None:
+            # 注册表中有已发布的版本时使用可热更新的句柄，否则直接加载 models/ 下的文件
+            handle = ModelHandle(registry, cache=cache, poll_interval=RELOAD_INTERVAL or None)
+            handle.start()
+            return handle
+        # 与 ModelHandle.refresh 一样预热：在 /readyz 返回就绪前完成各模型的反序列化，首批请求不承担加载开销
+        classifier = SpamClassifier(cache=cache)
+        classifier.load_models()
+        classifier.warm_up(WARMUP_TEXTS)
+        return classifier
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.classifier.version if isinstance(self.classifier, ModelHandle) else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        path, method = scope["path"], scope["method"]
+
+        if path == "/healthz" and method == "GET":
+            await self._send_json(send, 200, {"status": "ok"})
+        elif path == "/readyz" and method == "GET":
+            status = 200 if self.ready else 503
+            await self._send_json(send, status, {"ready": self.ready, "version": self.model_version})
+        elif path == "/predict" and method == "POST":
+            await self._predict(receive, send)
+        elif path == "/reload" and method == "POST":
+            await self._reload(send)
+        elif path == "/feedback" and method == "POST":
+            await self._feedback(receive, send)
+        elif path == "/metrics" and method == "GET" and self.metrics is not None:
+            await self._send(send, 200, self.metrics.to_prometheus().encode("utf-8"),
+                             b"text/plain; version=0.0.4; charset=utf-8")
+        else:
+            await self._send_json(send, 404, {"error": "not found"})
+
+    async def _predict(self, receive, send):
+        if not self.ready:
+            await self._send_json(send, 503, {"error": "模型尚未加载完成"})
+            return
+
+        payload = await self._read_json(receive, send)
+        if payload is None:
+            return
+
+        model_name = payload.get("model", DEFAULT_MODEL)
+        if not isinstance(model_name, str) or model_name not in self.classifier.models:
+            await self._send_json(send, 400, {"error": f"未知的模型: {model_name}"})
+            return
+
+        single = "text" in payload
+        texts = [payload["text"]] if single else payload.get("texts")
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            await self._send_json(send, 400, {"error": "需要提供字符串 text 或字符串列表 texts"})
+            return
+
+        predictions = await asyncio.gather(*(self.batcher.predict(model_name, text) for text in texts))
+        results = [
+            {"is_spam": bool(label), "probability": probability, "model_used": model_name}
+            for label, probability in predictions
+        ]
+        await self._send_json(send, 200, results[0] if single else {"results": results})
+
+    async def _reload(self, send):
+        if not isinstance(self.classifier, ModelHandle):
+            await self._send_json(send, 409, {"error": "未启用模型注册表，无法热更新"})
+            return
+        try:
+            reloaded = await asyncio.to_thread(self.classifier.refresh)
+        except Exception as e:
+            await self._send_json(send, 500, {"error": f"热更新失败: {e}", "version": self.model_version})
+            return
+        await self._send_json(send, 200, {"reloaded": reloaded, "version": self.model_version})
+
+    async def _feedback(self, receive, send):
+        payload = await self._read_json(receive, send)
+        if payload is None:
+            return
+
+        if "text" in payload:
+            texts, labels = [payload["text"]], [payload.get("label")]
+        else:
+            texts, labels = payload.get("texts"), payload.get("labels")
+        source = payload.get("source", "api")
+        if (
+            not isinstance(texts, list) or not isinstance(labels, list) or not isinstance(source, str)
+            or not all(isinstance(item, str) for item in texts + labels)
+        ):
+            await self._send_json(send, 400, {"error": "需要提供字符串 text + label 或等长的字符串列表 texts + labels"})
+            return
+
+        if self.feedback_store is None:
+            # 反馈存储依赖数据处理模块（nltk、pandera），只在第一次收到反馈时导入，不拖慢服务启动
+            from src.feedback import FeedbackStore
+
+            self.feedback_store = FeedbackStore()
+        try:
+            n_added = await asyncio.to_thread(self.feedback_store.add, texts, labels, source)
+        except ValueError as e:
+            await self._send_json(send, 400, {"error": str(e)})
+            return
+        await self._send_json(send, 200, {"added": n_added})
+
+    async def _read_json(self, receive, send) -> Optional[Dict[str, Any]]:
+        """读取 JSON 对象请求体；不是合法 JSON 或不是对象时返回 400 并返回 None"""
+        try:
+            payload = json.loads(await self._read_body(receive) or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            await self._send_json(send, 400, {"error": "请求体不是合法的 JSON"})
+            return None
+        if not isinstance(payload, dict):
+            await self._send_json(send, 400, {"error": "请求体必须是 JSON 对象"})
+            return None
+        return payload
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        return body
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await SpamServer._send(send, status, body, b"application/json; charset=utf-8")
+
+    @staticmethod
+    async def _send(send, status: int, body: bytes, content_type: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type),
+                        (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = SpamServer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="垃圾短信分类 HTTP 推理服务")
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="监听地址")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="单个微批次的最大请求数")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="凑批的最长等待时间（毫秒）")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("未安装 uvicorn，请先执行: uv sync --extra serve")
+        return
+
+    uvicorn.run(SpamServer(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import html
 import json
 import os
 import sys
@@ -16,14 +17,18 @@ if str(project_root) not in sys.path:
 # 尝试不同的导入方式，提高兼容性
 try:
     from src.agent import SpamAgent
-    from src.components import analysis_card, comparison_card, model_selector
+    from src.cache import PredictionCache
+    from src.components import comparison_card, model_selector
     from src.models import SpamClassifier
+    from src.registry import ModelHandle, ModelRegistry
 except ImportError:
     # 如果src.xxx导入失败，尝试直接从当前目录导入
     try:
         from agent import SpamAgent
-        from components import analysis_card, comparison_card, model_selector
+        from cache import PredictionCache
+        from components import comparison_card, model_selector
         from models import SpamClassifier
+        from registry import ModelHandle, ModelRegistry
     except ImportError as e:
         st.error(f"导入模块失败: {e}")
         st.stop()
@@ -41,7 +46,13 @@ with open(css_path, "r", encoding="utf-8") as f:
 
 @st.cache_resource
 def load_classifier():
-    classifier = SpamClassifier()
+    registry = ModelRegistry()
+    if registry.current_version() is not None:
+        # 注册表发布新版本后在后台预热并热切换，无需重启应用
+        handle = ModelHandle(registry, cache=PredictionCache())
+        handle.start()
+        return handle
+    classifier = SpamClassifier(cache=PredictionCache())
     classifier.load_models()
     return classifier
 
@@ -155,6 +166,7 @@ def render_prediction_section(classifier, agent, model):
     with col2:
         st.markdown('<div style="padding-top: 1.5rem;"></div>', unsafe_allow_html=True)
         compare_models = st.checkbox("对比模型", value=False)
+        force_llm = st.checkbox("强制 LLM 分析", value=False, help="默认只有预测概率处于不确定区间时才调用 LLM")
         analyze_btn = st.button("开始分析", use_container_width=True, type="primary")
     
     if analyze_btn and text_input:
@@ -169,9 +181,9 @@ def render_prediction_section(classifier, agent, model):
                 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
             
             prediction = agent.predict_spam(text_input, model)
-            analysis = agent.analyze_with_llm(text_input, prediction)
             
             st.markdown('<h2 style="text-align: center; margin-bottom: 1.5rem;">📋 分析结果</h2>', unsafe_allow_html=True)
+            caption_placeholder = st.empty()
             
             col_result, col_details = st.columns([1, 1])
             
@@ -204,51 +216,62 @@ def render_prediction_section(classifier, agent, model):
                     """, unsafe_allow_html=True)
             
             with col_details:
-                st.markdown(f"""
-                <div class="glass-card animate-fade-in">
-                    <h3 style="margin-top: 0;">📋 内容摘要</h3>
-                    <p style="font-size: 1.1rem;">{analysis.summary}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                risk_factors_html = ""
-                for factor in analysis.risk_factors:
-                    risk_factors_html += f'<p style="margin: 0.5rem 0; padding-left: 1rem; border-left: 3px solid var(--warning);">• {factor}</p>'
-                
-                st.markdown(f"""
-                <div class="glass-card animate-fade-in">
-                    <h3 style="margin-top: 0;">⚠️ 风险因素</h3>
-                    {risk_factors_html}
-                </div>
-                """, unsafe_allow_html=True)
+                summary_placeholder = st.empty()
+                risk_placeholder = st.empty()
             
             st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
             
             col_explain, col_action = st.columns([1, 1])
             
             with col_explain:
-                st.markdown(f"""
-                <div class="glass-card animate-fade-in">
-                    <h3 style="margin-top: 0;">💡 模型解释</h3>
-                    <p>{analysis.explanation}</p>
-                </div>
-                """, unsafe_allow_html=True)
+                explain_placeholder = st.empty()
             
             with col_action:
-                if prediction.is_spam:
-                    st.markdown(f"""
-                    <div class="glass-card animate-fade-in" style="border-left: 4px solid var(--danger);">
-                        <h3 style="margin-top: 0;">🎯 行动建议</h3>
-                        <p style="color: var(--danger); font-weight: 600;">{analysis.action_suggestion}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="glass-card animate-fade-in" style="border-left: 4px solid var(--success);">
-                        <h3 style="margin-top: 0;">🎯 行动建议</h3>
-                        <p style="color: var(--success); font-weight: 600;">{analysis.action_suggestion}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                action_placeholder = st.empty()
+            
+            # LLM 分析以流式方式逐步渲染，本地分析只渲染一次
+            placeholders = (summary_placeholder, risk_placeholder, explain_placeholder, action_placeholder)
+            for analysis in agent.analyze_stream(text_input, prediction, force_llm=force_llm):
+                render_analysis(placeholders, analysis, prediction)
+            
+            if analysis.source == "local":
+                caption_placeholder.caption("高置信度预测，已使用本地分析结果，未调用 LLM。勾选「强制 LLM 分析」可获取详细报告。")
+
+def render_analysis(placeholders, analysis, prediction):
+    summary_placeholder, risk_placeholder, explain_placeholder, action_placeholder = placeholders
+    
+    summary_placeholder.markdown(f"""
+    <div class="glass-card animate-fade-in">
+        <h3 style="margin-top: 0;">📋 内容摘要</h3>
+        <p style="font-size: 1.1rem;">{html.escape(analysis.summary)}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    risk_factors_html = ""
+    for factor in analysis.risk_factors:
+        risk_factors_html += f'<p style="margin: 0.5rem 0; padding-left: 1rem; border-left: 3px solid var(--warning);">• {html.escape(factor)}</p>'
+    
+    risk_placeholder.markdown(f"""
+    <div class="glass-card animate-fade-in">
+        <h3 style="margin-top: 0;">⚠️ 风险因素</h3>
+        {risk_factors_html}
+    </div>
+    """, unsafe_allow_html=True)
+    
+    explain_placeholder.markdown(f"""
+    <div class="glass-card animate-fade-in">
+        <h3 style="margin-top: 0;">💡 模型解释</h3>
+        <p>{html.escape(analysis.explanation)}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    color = "var(--danger)" if prediction.is_spam else "var(--success)"
+    action_placeholder.markdown(f"""
+    <div class="glass-card animate-fade-in" style="border-left: 4px solid {color};">
+        <h3 style="margin-top: 0;">🎯 行动建议</h3>
+        <p style="color: {color}; font-weight: 600;">{html.escape(analysis.action_suggestion)}</p>
+    </div>
+    """, unsafe_allow_html=True)
 
 def render_examples_section():
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
@@ -0,0 +1,188 @@
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 指标名称；所有埋点都通过下面的辅助函数写入，便于统一命名
+STAGE_SECONDS = "spam_stage_duration_seconds"
+CACHE_REQUESTS = "spam_cache_requests_total"
+PREDICTIONS = "spam_predictions_total"
+LLM_CALLS = "spam_llm_calls_total"
+LLM_TOKENS = "spam_llm_tokens_total"
+ERRORS = "spam_errors_total"
+BATCH_SIZE = "spam_batch_size"
+
+METRIC_HELP = {
+    STAGE_SECONDS: "各阶段耗时（秒）：language_detection / translation / cleaning / vectorization / scoring / llm_analysis 等",
+    CACHE_REQUESTS: "缓存查询次数，按缓存类型和是否命中区分",
+    PREDICTIONS: "模型打分的短信条数",
+    LLM_CALLS: "LLM 请求次数，按用途区分",
+    LLM_TOKENS: "LLM 消耗的 token 数，按用途和 prompt/completion 区分",
+    ERRORS: "各阶段的错误次数",
+    BATCH_SIZE: "推理服务微批次大小",
+}
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_NULL_TIMER = nullcontext()
+
+
+class NullMetrics:
+    """默认的空实现：所有调用都是空操作，关闭监控时几乎没有开销"""
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        pass
+
+    def observe(self, name: str, value: float, **labels: str):
+        pass
+
+    def timer(self, name: str, **labels: str):
+        return _NULL_TIMER
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "InMemoryMetrics", name: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class InMemoryMetrics(NullMetrics):
+    """进程内的计数器和直方图，线程安全，可导出为 Prometheus 文本格式"""
+
+    def __init__(self, buckets: Optional[Dict[str, Sequence[float]]] = None):
+        self.buckets = {BATCH_SIZE: BATCH_SIZE_BUCKETS, **(buckets or {})}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        # 每个直方图序列保存 [各桶计数（非累计）, 总和, 总数]
+        self._histograms: Dict[str, Dict[LabelKey, List[Any]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        buckets = self.buckets.get(name, DEFAULT_BUCKETS)
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def timer(self, name: str, **labels: str):
+        return _Timer(self, name, labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "histograms": {
+                    name: {key: [list(entry[0]), entry[1], entry[2]] for key, entry in series.items()}
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["counters"].items()):
+            lines.extend(_header(name, "counter"))
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, series in sorted(snapshot["histograms"].items()):
+            buckets = self.buckets.get(name, DEFAULT_BUCKETS)
+            lines.extend(_header(name, "histogram"))
+            for key, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, kind: str) -> List[str]:
+    lines = [f"# HELP {name} {METRIC_HELP[name]}"] if name in METRIC_HELP else []
+    lines.append(f"# TYPE {name} {kind}")
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{label}="{_escape(str(value))}"' for label, value in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+_metrics: NullMetrics = NullMetrics()
+
+
+def get_metrics() -> NullMetrics:
+    return _metrics
+
+
+def set_metrics(metrics: Optional[NullMetrics]) -> NullMetrics:
+    """安装全局指标实现（传 None 恢复为空实现），返回之前的实现"""
+    global _metrics
+    previous, _metrics = _metrics, metrics or NullMetrics()
+    return previous
+
+
+def stage_timer(stage: str):
+    return _metrics.timer(STAGE_SECONDS, stage=stage)
+
+
+def observe_stage(stage: str, seconds: float):
+    """记录一段不能用 stage_timer 包住的耗时，例如流式响应中不含调用方处理时间的部分"""
+    _metrics.observe(STAGE_SECONDS, seconds, stage=stage)
+
+
+def count_cache(cache: str, hits: int, misses: int):
+    if hits:
+        _metrics.inc(CACHE_REQUESTS, hits, cache=cache, result="hit")
+    if misses:
+        _metrics.inc(CACHE_REQUESTS, misses, cache=cache, result="miss")
+
+
+def count_error(stage: str):
+    _metrics.inc(ERRORS, stage=stage)
+
+
+def record_llm_call(purpose: str, response: Any = None):
+    """记录一次 LLM 请求；response 带有 usage 时同时累计 token 数"""
+    _metrics.inc(LLM_CALLS, purpose=purpose)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        _metrics.inc(LLM_TOKENS, getattr(usage, "prompt_tokens", 0) or 0, purpose=purpose, type="prompt")
+        _metrics.inc(LLM_TOKENS, getattr(usage, "completion_tokens", 0) or 0, purpose=purpose, type="completion")
@@ -0,0 +1,45 @@
+import re
+import string
+from typing import List
+
+import polars as pl
+
+# 修改 clean_text 的清洗规则时需递增该版本号，使特征缓存失效
+CLEAN_TEXT_VERSION = "1"
+
+_URL_PATTERN = re.compile(r"http\S+|www\S+|https\S+", flags=re.MULTILINE)
+_DIGIT_PATTERN = re.compile(r"[0-9]+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+# Polars 使用 Rust regex，其 \s 与 Python 的 str.isspace 不完全一致（如 \x1c-\x1f），
+# 这里显式列出 Python 认定的空白字符，保证两个引擎输出完全相同
+_PY_WHITESPACE = "".join(f"\\x{{{ord(c):X}}}" for c in map(chr, range(0x3001)) if c.isspace())
+_PL_URL_PATTERN = f"(?:http|www|https)[^{_PY_WHITESPACE}]+"
+_PL_PUNCTUATION_PATTERN = "[" + "".join(f"\\x{{{ord(c):X}}}" for c in string.punctuation) + "]"
+_PL_WHITESPACE_PATTERN = f"[{_PY_WHITESPACE}]+"
+
+
+def clean_text(text: str) -> str:
+    text = text.lower()
+    text = _URL_PATTERN.sub("", text)
+    text = _DIGIT_PATTERN.sub("", text)
+    text = text.translate(_PUNCTUATION_TABLE)
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+    return text
+
+
+def clean_text_expr(expr: pl.Expr) -> pl.Expr:
+    """与 clean_text 等价的 Polars 表达式，对整列向量化执行"""
+    return (
+        expr.str.to_lowercase()
+        .str.replace_all(_PL_URL_PATTERN, "")
+        .str.replace_all("[0-9]+", "")
+        .str.replace_all(_PL_PUNCTUATION_PATTERN, "")
+        .str.replace_all(_PL_WHITESPACE_PATTERN, " ")
+        .str.strip_chars(" ")
+    )
+
+
+def clean_text_batch(texts: List[str]) -> List[str]:
+    return [clean_text(text) for text in texts]
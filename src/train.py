@@ -1,37 +1,84 @@
+import argparse
 import json
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import polars as pl
 import seaborn as sns
 import matplotlib.pyplot as plt
 
-from src.data_processing import load_data, validate_data, preprocess_data, save_processed_data, prepare_train_test_split
-from src.models import SpamClassifier
+from src.data_processing import (
+    ARCHIVE_DIR, load_data, validate_data, preprocess_data, save_processed_data, load_processed_data,
+    prepare_train_test_split, iter_data_batches
+)
+from src.feature_cache import FeatureCache, cache_key
+from src.feedback import FeedbackStore, prepare_feedback
+from src.models import FEATURE_BACKENDS, MODEL_DIR, STREAMING_LGBM_MAX_ROWS, SpamClassifier
+from src.registry import ModelRegistry
+from src.tuning import LEADERBOARD_FILE, load_recommended_params, tune
 
 sns.set_theme(style="whitegrid")
 
 
 def main():
-    print("=" * 50)
-    print("垃圾短信分类模型训练")
-    print("=" * 50)
+    parser = argparse.ArgumentParser(description="垃圾短信分类模型训练")
+    parser.add_argument("--engine", type=str, default="polars", choices=["polars", "python"], help="文本预处理引擎")
+    parser.add_argument("--workers", type=int, default=None, help="python 引擎的并行进程数（polars 引擎忽略该参数）")
+    parser.add_argument("--executor", type=str, default="process", choices=["process", "thread"],
+                        help="python 引擎并行时使用进程池还是线程池")
+    parser.add_argument("--streaming", action="store_true", help="流式训练模式，适用于超出内存的数据集")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="流式训练模式下每批读取的行数")
+    parser.add_argument("--lgbm-max-rows", type=int, default=STREAMING_LGBM_MAX_ROWS,
+                        help="流式训练模式下 LightGBM 训练样本的行数上限，训练行更多时均匀抽样")
+    parser.add_argument("--no-cache", action="store_true", help="禁用 data/cache 下的特征缓存")
+    parser.add_argument("--params", type=Path, default=None, help="使用调参排行榜（tune 的输出）中的推荐参数训练")
+    parser.add_argument("--features", type=str, default="tfidf", choices=FEATURE_BACKENDS,
+                        help="特征后端：tfidf 保存完整词表，hashing 内存和模型文件大小与词表规模无关")
+    subparsers = parser.add_subparsers(dest="command")
 
-    print("\n1. 加载数据...")
-    df = load_data()
-    print(f"   数据集大小: {len(df)} 条")
-    print(f"   标签分布:\n{df['label'].value_counts()}")
+    tune_parser = subparsers.add_parser("tune", help="并行搜索向量化器和模型超参数")
+    tune_parser.add_argument("--trials", type=int, default=24, help="试验总数（Logistic Regression 与 LightGBM 各半）")
+    tune_parser.add_argument("--vectorizers", type=int, default=4, help="参与搜索的向量化配置数，同一配置的试验共享特征矩阵")
+    tune_parser.add_argument("--jobs", type=int, default=None, help="并行进程数，默认使用全部 CPU")
+    tune_parser.add_argument("--rungs", type=int, default=3, help="successive halving 的轮数")
+    tune_parser.add_argument("--eta", type=int, default=3, help="每轮保留前 1/eta 的试验")
+    tune_parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    tune_parser.add_argument("--output", type=Path, default=LEADERBOARD_FILE, help="排行榜输出路径")
 
-    print("\n2. 验证数据...")
-    df = validate_data(df)
-    print("   数据验证通过")
+    update_parser = subparsers.add_parser("update", help="用新的反馈数据增量更新当前模型并发布新版本")
+    update_parser.add_argument("--rounds", type=int, default=20, help="LightGBM 追加的树的数量")
+    update_parser.add_argument("--max-trees", type=int, default=None,
+                               help="LightGBM 总树数上限，追加后超过时完整重训（默认为 n_estimators 的 2 倍）")
+    update_parser.add_argument("--feedback-weight", type=float, default=2.0, help="反馈样本相对训练集样本的权重")
+    update_parser.add_argument("--min-rows", type=int, default=1, help="待处理反馈少于该条数时跳过本次更新")
+    update_parser.add_argument("--max-drop", type=float, default=0.01,
+                               help="测试集 macro F1 下降超过该值时只发布不切换，需人工确认")
+    update_parser.add_argument("--interval", type=float, default=None, help="按该间隔（秒）持续检查新反馈")
+    args = parser.parse_args()
 
-    print("\n3. 预处理数据...")
-    df = preprocess_data(df)
-    print(f"   预处理后数据集大小: {len(df)} 条")
+    if args.command == "tune":
+        tune_hyperparameters(args)
+        return
 
-    print("\n4. 保存处理后的数据...")
-    save_processed_data(df)
-    print("   数据已保存到 data/processed_spam.parquet")
+    if args.command == "update":
+        while True:
+            update_from_feedback(args)
+            if args.interval is None:
+                return
+            time.sleep(args.interval)
+
+    if args.streaming:
+        train_streaming(args.batch_size, args.lgbm_max_rows)
+        return
+
+    print("=" * 50)
+    print("垃圾短信分类模型训练")
+    print("=" * 50)
+
+    cache = None if args.no_cache else FeatureCache()
+    df, clean_key = load_dataset(cache, args.engine, args.workers, args.executor)
 
     print("\n5. 划分训练集和测试集...")
     train_df, test_df = prepare_train_test_split(df)
@@ -39,7 +86,12 @@ def main():
     print(f"   测试集大小: {len(test_df)} 条")
 
     print("\n6. 训练模型...")
-    classifier = SpamClassifier()
+    params = load_recommended_params(args.params) if args.params else {}
+    if params:
+        print(f"   使用推荐参数: {params}")
+    classifier = SpamClassifier(**params, feature_backend=args.features)
+    data_key = cache_key(clean_key, 0.2, 42) if cache else None
+    classifier.prepare_features(train_df, test_df, cache=cache, data_key=data_key)
 
     print("   训练 Logistic Regression 基线模型...")
     classifier.train_logistic_regression(train_df)
@@ -65,7 +117,8 @@ def main():
 
     print("\n8. 保存模型...")
     classifier.save_models()
-    print("   模型已保存到 models/ 目录")
+    version = ModelRegistry().publish(classifier)
+    print(f"   模型已保存到 models/ 目录，并发布为注册表版本 {version}")
 
     print("\n9. 生成评估报告...")
     save_evaluation_report(logreg_metrics, lgb_metrics)
@@ -75,6 +128,176 @@ def main():
     print("=" * 50)
 
 
+def load_dataset(
+    cache: Optional[FeatureCache],
+    engine: str = "polars",
+    n_workers: Optional[int] = None,
+    executor: str = "process",
+):
+    """加载并清洗原始数据，命中清洗缓存时直接返回；返回 (df, clean_key)"""
+    clean_key = cache.cleaned_key(ARCHIVE_DIR / "spam.csv") if cache else None
+    df = cache.load_cleaned(clean_key) if cache else None
+
+    if df is not None:
+        print(f"\n1-4. 命中清洗缓存 (key={clean_key})，跳过加载、验证和预处理")
+        print(f"   数据集大小: {len(df)} 条")
+        # train.py update 等从 data/processed_spam.parquet 读取训练数据，命中缓存时同样写出
+        save_processed_data(df)
+        return df, clean_key
+
+    print("\n1. 加载数据...")
+    df = load_data()
+    print(f"   数据集大小: {len(df)} 条")
+    print(f"   标签分布:\n{df['label'].value_counts()}")
+
+    print("\n2. 验证数据...")
+    df = validate_data(df)
+    print("   数据验证通过")
+
+    print("\n3. 预处理数据...")
+    df = preprocess_data(df, engine=engine, n_workers=n_workers, executor=executor)
+    print(f"   预处理后数据集大小: {len(df)} 条")
+
+    print("\n4. 保存处理后的数据...")
+    save_processed_data(df)
+    if cache:
+        cache.save_cleaned(clean_key, df)
+    print("   数据已保存到 data/processed_spam.parquet")
+    return df, clean_key
+
+
+def tune_hyperparameters(args):
+    print("=" * 50)
+    print("超参数搜索")
+    print("=" * 50)
+
+    # 调参依赖磁盘特征缓存在进程之间共享矩阵，因此忽略 --no-cache
+    cache = FeatureCache()
+    df, clean_key = load_dataset(cache, args.engine, args.workers, args.executor)
+
+    print("\n5. 划分训练集和测试集（测试集不参与调参）...")
+    train_df, _ = prepare_train_test_split(df)
+    data_key = cache_key(clean_key, 0.2, 42)
+
+    print("\n6. 搜索超参数...")
+    leaderboard = tune(
+        train_df, data_key, n_trials=args.trials, n_vectorizers=args.vectorizers, n_workers=args.jobs,
+        n_rungs=args.rungs, eta=args.eta, seed=args.seed, output=args.output,
+    )
+
+    print("\n7. 排行榜前 5 名:")
+    for trial in leaderboard["trials"][:5]:
+        last = trial["rungs"][-1]
+        print(f"   #{trial['id']:<3} {trial['model']:<9} macro F1 {last['macro_f1']:.4f}  ROC-AUC {last['roc_auc']:.4f}")
+        print(f"        tfidf={trial['tfidf_params']}  model={trial['model_params']}")
+
+    print(f"\n   排行榜已保存到 {args.output}，耗时 {leaderboard['meta']['elapsed_s']:.1f} 秒")
+    print(f"   使用推荐参数训练: uv run python -m src.train --params {args.output}")
+
+
+def update_from_feedback(args) -> Optional[str]:
+    """用待处理的反馈数据续训当前版本的模型，发布为新版本；返回新版本号（没有更新时为 None）"""
+    store = FeedbackStore()
+    registry = ModelRegistry()
+    store.compact()
+    pending = store.pending()
+    blocked = store.blocked()
+    if blocked and len(pending) > 0:
+        if registry.current_version() == blocked["version"]:
+            # 被拦截的版本已人工切换，对应的反馈视为已处理
+            store.mark_consumed(datetime.fromisoformat(blocked["until"]))
+            pending = store.pending()
+        elif pending["created_at"].max() <= datetime.fromisoformat(blocked["until"]):
+            print(f"没有新反馈，上次生成的版本 {blocked['version']} 未被切换: {blocked['reason']}")
+            print(f"确认后手动切换: uv run python -m src.registry activate {blocked['version']}")
+            return None
+    if len(pending) < args.min_rows:
+        print(f"待处理反馈 {len(pending)} 条，少于 {args.min_rows} 条，跳过本次更新")
+        return None
+
+    print("=" * 50)
+    print("增量更新模型")
+    print("=" * 50)
+
+    print(f"\n1. 读取反馈数据: {len(pending)} 条（{dict(pending['label'].value_counts().rows())}）")
+    feedback_df = prepare_feedback(pending)
+
+    print("\n2. 加载当前模型...")
+    parent = registry.current_version()
+    if parent is not None:
+        classifier = registry.load(parent)
+        print(f"   当前版本: {parent}")
+    else:
+        classifier = SpamClassifier()
+        classifier.load_models()
+        print("   注册表为空，使用 models/ 目录下的模型")
+
+    print("\n3. 准备训练集和测试集...")
+    train_df, test_df = prepare_train_test_split(load_processed_data())
+    print(f"   训练集: {len(train_df)} 条，测试集: {len(test_df)} 条")
+    before = {name: classifier.evaluate(name, test_df)["macro_f1"] for name in list(classifier.models)}
+
+    print("\n4. 续训模型...")
+    updated = classifier.update_incremental(
+        feedback_df, train_df, lgbm_rounds=args.rounds, feedback_weight=args.feedback_weight,
+        lgbm_max_trees=args.max_trees,
+    )
+    regressions = []
+    for name in updated:
+        after = classifier.evaluate(name, test_df)["macro_f1"]
+        print(f"   {name}: Macro F1 {before[name]:.4f} -> {after:.4f}")
+        if before[name] - after > args.max_drop:
+            regressions.append(f"{name} {before[name]:.4f} -> {after:.4f}")
+
+    print("\n5. 发布新版本...")
+    note = f"feedback update: {len(feedback_df)} rows"
+    version = registry.publish(classifier, activate=not regressions, note=note)
+    until = pending["created_at"].max()
+    if regressions:
+        reason = f"Macro F1 下降超过 {args.max_drop}: {'; '.join(regressions)}"
+        # 反馈保持待处理；人工切换到该版本后下一次 update 会把它们标记为已处理
+        store.mark_blocked(until, version, reason)
+        print(f"   警告: {reason}，版本 {version} 已发布但未切换，反馈保持待处理")
+        print(f"   确认后手动切换: uv run python -m src.registry activate {version}")
+    else:
+        # 从注册表加载时 model_dir 指向父版本目录，需显式写回 models/
+        classifier.save_models(model_dir=MODEL_DIR)
+        store.mark_consumed(until)
+        print(f"   已发布并切换到版本 {version}，推理服务会在后台热更新")
+    return version
+
+
+def train_streaming(batch_size: int, lgbm_max_rows: int = STREAMING_LGBM_MAX_ROWS):
+    print("=" * 50)
+    print("垃圾短信分类模型训练（流式模式）")
+    print("=" * 50)
+
+    print("\n1. 流式训练模型...")
+    classifier = SpamClassifier()
+    metrics = classifier.train_streaming(lambda: iter_data_batches(batch_size=batch_size), lgbm_max_rows=lgbm_max_rows)
+    logreg_metrics, lgb_metrics = metrics["logreg"], metrics["lightgbm"]
+
+    print("\n2. 评估结果:")
+    for display_name, model_metrics in [("SGD Logistic Regression", logreg_metrics), ("LightGBM", lgb_metrics)]:
+        print(f"\n   {display_name} 性能:")
+        print(f"   - Accuracy: {model_metrics['accuracy']:.4f}")
+        print(f"   - F1 Score: {model_metrics['f1_score']:.4f}")
+        print(f"   - Macro F1: {model_metrics['macro_f1']:.4f}")
+        print(f"   - ROC-AUC: {model_metrics['roc_auc']:.4f}")
+
+    print("\n3. 保存模型...")
+    classifier.save_models()
+    version = ModelRegistry().publish(classifier)
+    print(f"   模型已保存到 models/ 目录，并发布为注册表版本 {version}")
+
+    print("\n4. 生成评估报告...")
+    save_evaluation_report(logreg_metrics, lgb_metrics)
+
+    print("\n" + "=" * 50)
+    print("训练完成！")
+    print("=" * 50)
+
+
 def save_evaluation_report(logreg_metrics, lgb_metrics):
     report = {
         "logistic_regression": {
@@ -0,0 +1,260 @@
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+from src.data_processing import DATA_DIR, prepare_train_test_split
+from src.feature_cache import FeatureCache, cache_key
+from src.models import SpamClassifier
+
+LEADERBOARD_FILE = DATA_DIR / "tuning_leaderboard.json"
+
+TFIDF_SPACE = {
+    "max_features": [5000, 10000, 20000, 50000],
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "sublinear_tf": [False, True],
+    "min_df": [1, 2],
+}
+LOGREG_SPACE = {
+    "C": [0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0],
+}
+LGBM_SPACE = {
+    "learning_rate": [0.03, 0.05, 0.1, 0.2],
+    "num_leaves": [15, 31, 63],
+    "min_child_samples": [5, 10, 20],
+    "colsample_bytree": [0.5, 0.8, 1.0],
+    "n_estimators": [200, 500, 1000],
+}
+
+# LightGBM 在验证集上连续这么多轮没有改善就提前停止
+EARLY_STOPPING_ROUNDS = 30
+
+# 每个工作进程缓存已加载的特征矩阵，同一向量化配置的试验只读一次磁盘
+_worker_features: Dict[str, Tuple[Any, Any, np.ndarray, np.ndarray]] = {}
+
+
+def _sample(space: Dict[str, List[Any]], rng: random.Random) -> Dict[str, Any]:
+    return {key: rng.choice(values) for key, values in space.items()}
+
+
+def sample_trials(n_trials: int, n_vectorizers: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """先抽取少量向量化配置，再把模型配置分配到这些向量化配置上，使试验之间尽量共享特征矩阵"""
+    rng = random.Random(seed)
+    n_vectorizers = min(n_vectorizers, math.prod(len(values) for values in TFIDF_SPACE.values()))
+    vectorizers = []
+    while len(vectorizers) < n_vectorizers:
+        params = _sample(TFIDF_SPACE, rng)
+        if params not in vectorizers:
+            vectorizers.append(params)
+
+    trials = []
+    for i in range(n_trials):
+        model = "logreg" if i % 2 == 0 else "lightgbm"
+        trials.append({
+            "id": i,
+            "model": model,
+            "tfidf_params": vectorizers[(i // 2) % n_vectorizers],
+            "model_params": _sample(LOGREG_SPACE if model == "logreg" else LGBM_SPACE, rng),
+        })
+    return trials
+
+
+def _build_features(tfidf_params: Dict[str, Any], fit_df: pl.DataFrame, val_df: pl.DataFrame, data_key: str) -> str:
+    """在工作进程中拟合向量化器并写入磁盘特征缓存，返回缓存键"""
+    cache = FeatureCache()
+    classifier = SpamClassifier(tfidf_params=tfidf_params)
+    classifier.prepare_features(fit_df, val_df, cache=cache, data_key=data_key)
+    return cache.features_key(data_key, classifier.tfidf.get_params())
+
+
+def _load_features(features_key: str, y_fit: np.ndarray, y_val: np.ndarray):
+    if features_key not in _worker_features:
+        _, X_fit, X_val = FeatureCache().load_features(features_key)
+        _worker_features[features_key] = (X_fit, X_val, y_fit, y_val)
+    return _worker_features[features_key]
+
+
+def _run_trial(
+    trial: Dict[str, Any],
+    features_key: str,
+    fraction: float,
+    y_fit: np.ndarray,
+    y_val: np.ndarray,
+    n_jobs: int,
+) -> Dict[str, Any]:
+    """用前 fraction 比例的训练行训练一个试验，在验证集上打分"""
+    from sklearn.metrics import f1_score, roc_auc_score
+
+    X_fit, X_val, y_fit, y_val = _load_features(features_key, y_fit, y_val)
+    n_rows = max(1, int(X_fit.shape[0] * fraction))
+    start = time.perf_counter()
+
+    result = {}
+    if trial["model"] == "logreg":
+        model = SpamClassifier(logreg_params=trial["model_params"]).new_logistic_regression()
+        model.fit(X_fit[:n_rows], y_fit[:n_rows])
+    else:
+        import lightgbm as lgb
+
+        model = SpamClassifier(lgbm_params=trial["model_params"]).new_lightgbm(n_jobs=n_jobs)
+        model.fit(
+            X_fit[:n_rows], y_fit[:n_rows],
+            eval_set=[(X_val, y_val)],
+            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)],
+        )
+        result["best_iteration"] = int(model.best_iteration_ or trial["model_params"]["n_estimators"])
+
+    y_proba = model.predict_proba(X_val)[:, 1]
+    y_pred = (y_proba >= 0.5).astype(np.int32)
+    result.update({
+        "macro_f1": float(f1_score(y_val, y_pred, average="macro")),
+        "roc_auc": float(roc_auc_score(y_val, y_proba)),
+        "train_rows": n_rows,
+        "elapsed_s": time.perf_counter() - start,
+    })
+    return result
+
+
+def _rungs(n_rungs: int, eta: int) -> List[float]:
+    return [1 / eta ** (n_rungs - 1 - i) for i in range(n_rungs)]
+
+
+def successive_halving(
+    pool: ProcessPoolExecutor,
+    trials: List[Dict[str, Any]],
+    features: Dict[int, str],
+    y_fit: np.ndarray,
+    y_val: np.ndarray,
+    n_rungs: int = 3,
+    eta: int = 3,
+    n_jobs: int = 1,
+):
+    """逐级增加训练数据量；每一级只保留同类模型中排名前 1/eta 的试验进入下一级"""
+    alive = list(trials)
+    for rung, fraction in enumerate(_rungs(n_rungs, eta)):
+        print(f"   第 {rung + 1}/{n_rungs} 轮: {len(alive)} 个试验，使用 {fraction:.0%} 的训练数据")
+        futures = {
+            pool.submit(_run_trial, trial, features[trial["id"]], fraction, y_fit, y_val, n_jobs): trial
+            for trial in alive
+        }
+        for future in as_completed(futures):
+            trial = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}", "macro_f1": float("-inf"), "roc_auc": float("-inf")}
+            trial.setdefault("rungs", []).append({"rung": rung, "fraction": fraction, **result})
+
+        if rung == n_rungs - 1:
+            break
+        survivors = []
+        for model in ("logreg", "lightgbm"):
+            group = sorted((t for t in alive if t["model"] == model), key=_trial_score, reverse=True)
+            keep = max(1, math.ceil(len(group) / eta)) if group else 0
+            survivors.extend(group[:keep])
+            for trial in group[keep:]:
+                trial["stopped_at_rung"] = rung
+        alive = survivors
+
+
+def _trial_score(trial: Dict[str, Any]) -> Tuple[int, float, float]:
+    # 先比较到达的轮次，再比较最后一轮的 macro F1 和 ROC-AUC
+    last = trial["rungs"][-1]
+    return len(trial["rungs"]), last["macro_f1"], last["roc_auc"]
+
+
+def build_leaderboard(trials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ranked = sorted(trials, key=_trial_score, reverse=True)
+    best = {}
+    for model in ("logreg", "lightgbm"):
+        group = [t for t in ranked if t["model"] == model and "error" not in t["rungs"][-1]]
+        if group:
+            best[model] = group[0]
+
+    # SpamClassifier 中两个模型共用一个向量化器：取总体最优试验的向量化配置，
+    # 再为每种模型选出使用该向量化配置的最优参数（没有时退回该模型的最优参数）
+    recommended = {}
+    if best:
+        winner = max(best.values(), key=_trial_score)
+        recommended["tfidf_params"] = winner["tfidf_params"]
+        for model, key in (("logreg", "logreg_params"), ("lightgbm", "lgbm_params")):
+            group = [t for t in ranked if t["model"] == model and t["tfidf_params"] == winner["tfidf_params"]
+                     and "error" not in t["rungs"][-1]]
+            choice = group[0] if group else best.get(model)
+            if choice is None:
+                continue
+            params = dict(choice["model_params"])
+            if "best_iteration" in choice["rungs"][-1]:
+                params["n_estimators"] = choice["rungs"][-1]["best_iteration"]
+            recommended[key] = params
+
+    return {
+        "best": {model: trial["id"] for model, trial in best.items()},
+        "recommended": recommended,
+        "trials": ranked,
+    }
+
+
+def tune(
+    train_df: pl.DataFrame,
+    data_key: str,
+    n_trials: int = 24,
+    n_vectorizers: int = 4,
+    n_workers: Optional[int] = None,
+    n_rungs: int = 3,
+    eta: int = 3,
+    seed: int = 42,
+    output: Path = LEADERBOARD_FILE,
+) -> Dict[str, Any]:
+    """在 train_df 内再划分出验证集做超参数搜索，测试集不参与调参"""
+    start = time.perf_counter()
+    n_workers = n_workers or os.cpu_count() or 1
+    fit_df, val_df = prepare_train_test_split(train_df, test_size=0.2, random_state=seed + 1)
+    y_fit = fit_df["label_encoded"].to_numpy()
+    y_val = val_df["label_encoded"].to_numpy()
+    split_key = cache_key(data_key, "tune", 0.2, seed + 1)
+
+    trials = sample_trials(n_trials, min(n_vectorizers, n_trials), seed)
+    vectorizers = []
+    for trial in trials:
+        if trial["tfidf_params"] not in vectorizers:
+            vectorizers.append(trial["tfidf_params"])
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        print(f"   构建 {len(vectorizers)} 组向量化特征（并行 {n_workers} 个进程）...")
+        keys = list(pool.map(_build_features, vectorizers, [fit_df] * len(vectorizers),
+                             [val_df] * len(vectorizers), [split_key] * len(vectorizers)))
+        features = {trial["id"]: keys[vectorizers.index(trial["tfidf_params"])] for trial in trials}
+
+        print(f"   运行 {len(trials)} 个试验（successive halving, eta={eta}）...")
+        # 多进程并行时每个 LightGBM 只用一个线程，避免线程数超过 CPU 核数
+        successive_halving(pool, trials, features, y_fit, y_val, n_rungs, eta, n_jobs=1 if n_workers > 1 else -1)
+
+    leaderboard = build_leaderboard(trials)
+    leaderboard["meta"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "n_trials": n_trials,
+        "n_vectorizers": len(vectorizers),
+        "n_rungs": n_rungs,
+        "eta": eta,
+        "seed": seed,
+        "metric": "macro_f1",
+        "elapsed_s": time.perf_counter() - start,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(leaderboard, f, indent=2, ensure_ascii=False, default=str)
+    return leaderboard
+
+
+def load_recommended_params(path: Path = LEADERBOARD_FILE) -> Dict[str, Dict[str, Any]]:
+    """读取排行榜中的推荐参数，可直接作为 SpamClassifier 的关键字参数"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["recommended"]
@@ -0,0 +1,64 @@
+import numpy as np
+import polars as pl
+import pytest
+from sklearn.pipeline import Pipeline
+
+from src.data_processing import load_data
+from src.fast_scorer import LinearScorer
+from src.models import SpamClassifier
+from src.text_cleaning import clean_text_expr
+
+
+@pytest.fixture(scope="module")
+def spam_data():
+    df = load_data().with_columns(clean_text_expr(pl.col("text")).alias("cleaned_text"))
+    texts = df["cleaned_text"].to_list()
+    labels = (df["label"] == "spam").cast(pl.Int32).to_list()
+    return texts, labels
+
+
+def fit_pipeline(texts, labels, **tfidf_params) -> Pipeline:
+    classifier = SpamClassifier(tfidf_params=tfidf_params)
+    pipeline = Pipeline([("tfidf", classifier.new_vectorizer()), ("clf", classifier.new_logistic_regression())])
+    return pipeline.fit(texts, labels)
+
+
+@pytest.mark.parametrize("tfidf_params", [
+    {},
+    {"sublinear_tf": True, "norm": "l1"},
+    {"binary": True, "norm": None, "analyzer": "char_wb", "ngram_range": (2, 4)},
+])
+def test_linear_scorer_matches_pipeline(spam_data, tfidf_params):
+    texts, labels = spam_data
+    pipeline = fit_pipeline(texts, labels, **tfidf_params)
+    scorer = LinearScorer.from_pipeline(pipeline)
+    assert scorer is not None
+
+    # 含训练集外的词和空文本，覆盖未登录 n-gram 和零向量
+    samples = texts + ["", "zzqx unseen tokens only", "free entry win cash prize now"]
+    expected = pipeline.predict_proba(samples)[:, 1]
+    np.testing.assert_allclose(scorer.predict_proba(samples), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_unsupported_pipeline_returns_none(spam_data):
+    texts, labels = spam_data
+    classifier = SpamClassifier()
+    pipeline = Pipeline([("tfidf", classifier.new_vectorizer()), ("clf", classifier.new_lightgbm(n_estimators=5))])
+    pipeline.fit(texts, labels)
+    assert LinearScorer.from_pipeline(pipeline) is None
+
+
+def test_contributions_match_coefficients_times_features(spam_data):
+    texts, labels = spam_data
+    pipeline = fit_pipeline(texts, labels, sublinear_tf=True)
+    scorer = LinearScorer.from_pipeline(pipeline)
+    terms, coef = pipeline[0].get_feature_names_out(), pipeline[-1].coef_[0]
+
+    for text in texts[:200]:
+        row = pipeline[0].transform([text]).tocsr()
+        expected = {terms[index]: coef[index] * value for index, value in zip(row.indices, row.data)}
+        contributions = scorer.contributions(text)
+        assert contributions.keys() == expected.keys()
+        for term, value in expected.items():
+            assert contributions[term] == pytest.approx(value, rel=1e-9, abs=1e-12)
+        assert sum(contributions.values()) + scorer.bias == pytest.approx(scorer.decision_function(text), rel=1e-9, abs=1e-12)
@@ -0,0 +1,31 @@
+import polars as pl
+import pytest
+
+from src.data_processing import load_data
+from src.text_cleaning import clean_text, clean_text_batch, clean_text_expr
+
+
+def clean_with_polars(texts):
+    return pl.DataFrame({"text": texts}).select(clean_text_expr(pl.col("text")))["text"].to_list()
+
+
+def test_polars_engine_matches_python_on_bundled_data():
+    texts = load_data()["text"].to_list()
+    assert clean_with_polars(texts) == clean_text_batch(texts)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "WIN £1000!!! Call 09061701461 now",
+    "visit http://example.com/claim?id=1 or www.win.co.uk today",
+    "url at end https://x.y",
+    "tab\tnew\nline\r\nspaces   here",
+    # Rust regex 的 \s 不包含 \x1c-\x1f，Python 的 str.isspace 包含
+    "field\x1csep\x1dgroup\x1erecord\x1funit",
+    "nbsp\xa0ideographic\u3000line\u2028para\u2029end",
+    "http\x1fafter-url",
+    "Ünïcödé ÄÖÜ straße",
+])
+def test_polars_engine_matches_python_on_edge_cases(text):
+    assert clean_with_polars([text]) == [clean_text(text)]
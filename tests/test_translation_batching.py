@@ -0,0 +1,120 @@
+import json
+from types import SimpleNamespace
+
+from src.agent import MAX_OUTPUT_TOKENS, TRANSLATION_BATCH_SIZE, TRANSLATION_TOKENS_PER_TEXT, SpamAgent
+from src.cache import TranslationCache
+
+
+class FakeCompletions:
+    """记录每次请求的参数；按请求内容返回预设的回复，或抛出异常模拟 API 报错"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.reply(kwargs)
+        if isinstance(content, Exception):
+            raise content
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        )
+
+
+def make_agent(reply):
+    completions = FakeCompletions(reply)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent = SpamAgent(ml_model=None, client=client, translation_cache=TranslationCache())
+    return agent, completions
+
+
+def is_batch_request(kwargs) -> bool:
+    return "JSON 数组" in kwargs["messages"][-1]["content"]
+
+
+def batch_texts(kwargs):
+    content = kwargs["messages"][-1]["content"]
+    return json.loads(content[content.index("["):])
+
+
+TEXTS = [f"第{i}条中奖通知" for i in range(TRANSLATION_BATCH_SIZE)]
+
+
+def test_full_batch_is_one_request_within_output_limit():
+    agent, completions = make_agent(lambda kwargs: json.dumps([f"en:{t}" for t in batch_texts(kwargs)]))
+
+    assert agent.translate_batch(TEXTS) == [f"en:{t}" for t in TEXTS]
+    assert len(completions.calls) == 1
+    assert is_batch_request(completions.calls[0])
+    assert batch_texts(completions.calls[0]) == TEXTS
+    assert completions.calls[0]["max_tokens"] <= MAX_OUTPUT_TOKENS
+
+    # 结果已写入翻译缓存，再次翻译不发请求
+    assert agent.translate_batch(TEXTS[:3]) == [f"en:{t}" for t in TEXTS[:3]]
+    assert len(completions.calls) == 1
+
+
+def test_non_chinese_and_duplicate_texts_are_not_sent():
+    agent, completions = make_agent(lambda kwargs: json.dumps([f"en:{t}" for t in batch_texts(kwargs)]))
+
+    assert agent.translate_batch(["hello", "中奖了", "中奖了"]) == ["hello", "en:中奖了", "en:中奖了"]
+    assert len(completions.calls) == 1
+    assert batch_texts(completions.calls[0]) == ["中奖了"]
+
+
+def test_unparseable_batch_falls_back_to_one_request_per_text():
+    def reply(kwargs):
+        if is_batch_request(kwargs):
+            return "抱歉，我无法按要求输出 JSON"
+        return "en:" + kwargs["messages"][-1]["content"].split("\n\n")[-1]
+
+    agent, completions = make_agent(reply)
+
+    assert agent.translate_batch(TEXTS[:3]) == [f"en:{t}" for t in TEXTS[:3]]
+    assert len(completions.calls) == 4
+    assert all(call["max_tokens"] == TRANSLATION_TOKENS_PER_TEXT for call in completions.calls[1:])
+
+
+def test_failed_batch_request_falls_back_to_one_request_per_text():
+    def reply(kwargs):
+        if is_batch_request(kwargs):
+            return RuntimeError("400 max_tokens out of range")
+        return "en:" + kwargs["messages"][-1]["content"].split("\n\n")[-1]
+
+    agent, completions = make_agent(reply)
+
+    assert agent.translate_batch(TEXTS[:2]) == [f"en:{t}" for t in TEXTS[:2]]
+    assert len(completions.calls) == 3
+
+
+class FakeModel:
+    """记录 predict_models 的调用参数"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_models(self, model_names, text, use_cache=True):
+        self.calls.append((text, use_cache))
+        return {name: 0.5 for name in model_names}
+
+    def is_spam(self, model_name, probability):
+        return probability >= 0.5
+
+
+def test_failed_translation_is_not_written_to_prediction_cache():
+    agent, _ = make_agent(lambda kwargs: RuntimeError("503 service unavailable"))
+    agent.ml_model = FakeModel()
+
+    agent.predict_spam("中奖了", "logreg")
+    assert agent.ml_model.calls == [("中奖了", False)]
+
+
+def test_translated_and_english_texts_use_prediction_cache():
+    agent, _ = make_agent(lambda kwargs: "you won")
+    agent.ml_model = FakeModel()
+
+    agent.predict_spam("中奖了", "logreg")
+    agent.predict_spam("hello", "logreg")
+    assert agent.ml_model.calls == [("you won", True), ("hello", True)]